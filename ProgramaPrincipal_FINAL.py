@@ -1,25 +1,17 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy import constants
 from controlador_pendulo_FINAL import crear_controlador
-from visualizar import visualizar_en_tiempo_real
-import animacion_carrito
+from simulacion import normalizar_angulo, calcula_aceleracion
 
+# matplotlib, pygame y las animaciones se importan recién cuando se grafica o se anima,
+# así el módulo se puede importar sin abrir ventanas (por ejemplo desde procesos de un barrido)
 
-# Constantes físicas
-CONSTANTE_M = 1 # Masa del carro
-CONSTANTE_m = 0.1 # Masa de la pertiga
-CONSTANTE_l = 0.5 # Longitud dela pertiga
 dt=0.01
 
-# Crear controlador difuso
-controller = crear_controlador()
+# Crear controlador difuso (compilado: misma salida, curvas de F precalculadas)
+controller = crear_controlador().compilar()
 
-# Función para normalizar el ángulo al rango [-π, π]
-def normalizar_angulo(angulo):
-    return (angulo + np.pi) % (2 * np.pi) - np.pi
-
-# Simula el modelo del carro-pendulo con lógica difusa
+# Simula el modelo del carro-pendulo con lógica difusa. No grafica ni anima: devuelve los
+# tiempos y las trayectorias de θ (grados), θ' y F como arrays
 def simular(t_max, delta_t, theta_0, v_0, a_0):
     theta = np.radians(theta_0)  # radianes
     v = v_0
@@ -45,10 +37,12 @@ def simular(t_max, delta_t, theta_0, v_0, a_0):
         y_theta_dot.append(v)
         y_fuerza.append(f)
 
-    #para graficar en tiempo real
-    #visualizar_en_tiempo_real(y_theta, y_fuerza, x)
+    return x, np.array(y_theta), np.array(y_theta_dot), np.array(y_fuerza)
+
+# Graficar los 3 resultados en subplots
+def graficar_simulacion(x, y_theta, y_theta_dot, y_fuerza):
+    import matplotlib.pyplot as plt
 
-    # Graficar los 3 resultados en subplots
     fig, axs = plt.subplots(3, 1, figsize=(10, 10))
 
     axs[0].plot(x, y_theta)
@@ -70,18 +64,27 @@ def simular(t_max, delta_t, theta_0, v_0, a_0):
     plt.tight_layout()
     plt.show()
 
-    animacion_carrito.visualizar_en_tiempo_real(y_theta, y_fuerza, x)
+#para graficar en tiempo real
+def graficar_en_tiempo_real(x, y_theta, y_fuerza):
+    from visualizar import visualizar_en_tiempo_real
+    visualizar_en_tiempo_real(y_theta, y_fuerza, x)
 
+def animar_simulacion(x, y_theta, y_fuerza):
+    import animacion_carrito
+    animacion_carrito.visualizar_en_tiempo_real(y_theta, y_fuerza, x)
 
+# Simula en un hilo aparte y anima a medida que se generan las muestras (memoria constante,
+# sirve también para corridas sin fin con t_max=None)
+def simular_en_vivo(delta_t, theta_0, v_0, t_max=None):
+    import animacion_carrito
+    from simulacion import simular_stream, flujo_en_hilo
 
-# Cálculo de aceleración angular θ'' con fuerza f
-def calcula_aceleracion(theta, v, f):
-    sin_theta = np.sin(theta)
-    cos_theta = np.cos(theta)
-    num = constants.g * sin_theta + cos_theta * ((-f - CONSTANTE_m * CONSTANTE_l * v**2 * sin_theta) / (CONSTANTE_M + CONSTANTE_m))
-    denom = CONSTANTE_l * (4/3 - (CONSTANTE_m * cos_theta**2) / (CONSTANTE_M + CONSTANTE_m))
-    return num / denom if abs(denom) > 1e-6 else 0
+    muestras = flujo_en_hilo(simular_stream(controller, delta_t, theta_0, v_0, t_max))
+    animacion_carrito.visualizar_stream(((t, theta, f) for t, theta, _, f in muestras), dt=delta_t)
 
-# Ejecutar simulación
-simular(t_max=5, delta_t=0.01, theta_0=-90, v_0=0, a_0=0)
 
+if __name__ == "__main__":
+    # Ejecutar simulación
+    x, y_theta, y_theta_dot, y_fuerza = simular(t_max=5, delta_t=0.01, theta_0=-90, v_0=0, a_0=0)
+    graficar_simulacion(x, y_theta, y_theta_dot, y_fuerza)
+    animar_simulacion(x, y_theta, y_fuerza)
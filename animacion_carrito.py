@@ -1,3 +1,5 @@
+import time
+
 import pygame
 import numpy as np
 
@@ -7,6 +9,11 @@ ALTO_VENTANA = 1080
 ESCALA = 200  # Escala en píxeles por metro
 FACTOR_DESPLAZAMIENTO = 60 # Factor para hacer más notorio el desplazamiento
 
+# Dimensiones y posición vertical del carrito
+CARRITO_Y = ALTO_VENTANA - 150  # Un poco arriba del piso
+CARRITO_ANCHO = 80
+CARRITO_ALTO = 40
+
 # Colores
 BLANCO = (255, 255, 255)
 NEGRO = (0, 0, 0)
@@ -14,97 +21,205 @@ AZUL = (0, 0, 255)
 ROJO = (255, 0, 0)
 VERDE = (0, 255, 0)
 
-# Fuente para la información en pantalla
-pygame.font.init()
-FUENTE = pygame.font.Font(None, 36)
+# Fuente para la información en pantalla (se crea al animar, no al importar el módulo)
+_fuente = None
 
-# Función para visualizar la simulación en tiempo real
-def visualizar_en_tiempo_real(y_theta, y_fuerza, tiempos, L=0.5, dt=0.01, m_carrito=1):
+def obtener_fuente():
+    global _fuente
+    if _fuente is None:
+        pygame.font.init()
+        _fuente = pygame.font.Font(None, 36)
+    return _fuente
+
+# pygame.quit() invalida la fuente: se descarta para crearla de nuevo en la próxima animación
+def cerrar_ventana():
+    global _fuente
+    _fuente = None
+    pygame.quit()
+
+# Piso completo de la ventana (parte fija de todos los cuadros)
+def _dibujar_piso(pantalla):
+    pygame.draw.line(pantalla, NEGRO, 
+             (0, CARRITO_Y + CARRITO_ALTO // 2 ), 
+             (ANCHO_VENTANA, CARRITO_Y + CARRITO_ALTO // 2), 5)
+
+# Carrito, pértiga e indicador de fuerza. Devuelve los rectángulos de pantalla que modificó
+def _dibujar_carrito(pantalla, carrito_x, theta_deg, fuerza, L=0.5):
+    carrito_y = CARRITO_Y
+    carrito_ancho = CARRITO_ANCHO
+    carrito_alto = CARRITO_ALTO
+    rects = []
+
+    # Dibujar la línea del piso debajo del carrito (justo en la base del carrito)
+    rects.append(pygame.draw.line(pantalla, NEGRO, 
+                     (carrito_x - carrito_ancho // 2, carrito_y + carrito_alto // 2), 
+                     (carrito_x + carrito_ancho // 2, carrito_y + carrito_alto // 2), 5))
+
+    # Carrito
+    rects.append(pygame.draw.rect(pantalla, AZUL, (carrito_x - carrito_ancho // 2, carrito_y - carrito_alto // 2, carrito_ancho, carrito_alto)))
+
+    # Pértiga
+    theta_rad = np.radians(theta_deg)
+    x_final = carrito_x + L * ESCALA * np.sin(theta_rad)
+    y_final = carrito_y - L * ESCALA * np.cos(theta_rad)
+
+    rects.append(pygame.draw.line(pantalla, AZUL, (carrito_x, carrito_y), (x_final, y_final), 5))
+    rects.append(pygame.draw.circle(pantalla, AZUL, (int(x_final), int(y_final)), 10))
+
+    # Indicador de fuerza
+    if fuerza != 0:
+        color_fuerza = ROJO
+        direccion = 1 if fuerza > 0 else -1
+        longitud = min(100, abs(fuerza) * 5)
+
+        rects.append(pygame.draw.line(pantalla, color_fuerza,
+                        (carrito_x, carrito_y + 20),
+                        (carrito_x + direccion * longitud, carrito_y + 20), 5))
+        rects.append(pygame.draw.polygon(pantalla, color_fuerza, [
+            (carrito_x + direccion * longitud, carrito_y + 15),
+            (carrito_x + direccion * longitud, carrito_y + 25),
+            (carrito_x + direccion * (longitud + 10), carrito_y + 20)
+        ]))
+    return rects
+
+# Dibuja un cuadro completo: piso, carrito en carrito_x, pértiga con ángulo theta_deg, textos y flecha de fuerza
+def dibujar_cuadro(pantalla, fuente, carrito_x, theta_deg, fuerza, t, L=0.5):
+    pantalla.fill(BLANCO)
+    _dibujar_piso(pantalla)
+    _dibujar_carrito(pantalla, carrito_x, theta_deg, fuerza, L)
+
+    # Mostrar información sobre el ángulo, fuerza y tiempo
+    texto_angulo = fuente.render(f"Ángulo: {theta_deg:.1f}°", True, NEGRO)
+    texto_fuerza = fuente.render(f"Fuerza: {fuerza:.2f} N", True, NEGRO)
+    texto_tiempo = fuente.render(f"Tiempo: {t:.2f} s", True, NEGRO)
+
+    pantalla.blit(texto_angulo, (20, 20))
+    pantalla.blit(texto_fuerza, (20, 60))
+    pantalla.blit(texto_tiempo, (20, 100))
+
+# Dibuja sobre la ventana solo lo que cambia: el fondo (blanco, piso y etiquetas) se renderiza una
+# vez, cada cuadro restaura del fondo las zonas que ocupaba el cuadro anterior, y los valores de
+# los textos se vuelven a renderizar solo cuando cambia el texto mostrado
+class Renderizador:
+    ETIQUETAS = ("Ángulo: ", "Fuerza: ", "Tiempo: ")
+
+    def __init__(self, pantalla, fuente):
+        self.pantalla = pantalla
+        self.fuente = fuente
+        self.fondo = pygame.Surface(pantalla.get_size())
+        self.fondo.fill(BLANCO)
+        _dibujar_piso(self.fondo)
+        self.x_valores = []
+        for i, etiqueta in enumerate(self.ETIQUETAS):
+            superficie = fuente.render(etiqueta, True, NEGRO)
+            self.fondo.blit(superficie, (20, 20 + 40 * i))
+            self.x_valores.append(20 + superficie.get_width())
+        self.textos = [None] * len(self.ETIQUETAS) # (texto, superficie) mostrados
+        self.sucios = [] # zonas dibujadas en el cuadro anterior
+        pantalla.blit(self.fondo, (0, 0))
+        pygame.display.flip()
+
+    def dibujar(self, carrito_x, theta_deg, fuerza, t, L=0.5):
+        for rect in self.sucios:
+            self.pantalla.blit(self.fondo, rect, rect)
+        nuevos = _dibujar_carrito(self.pantalla, carrito_x, theta_deg, fuerza, L)
+
+        valores = (f"{theta_deg:.1f}°", f"{fuerza:.2f} N", f"{t:.2f} s")
+        for i, valor in enumerate(valores):
+            if self.textos[i] is None or self.textos[i][0] != valor:
+                self.textos[i] = (valor, self.fuente.render(valor, True, NEGRO))
+            nuevos.append(self.pantalla.blit(self.textos[i][1], (self.x_valores[i], 20 + 40 * i)))
+
+        pygame.display.update(self.sucios + nuevos)
+        self.sucios = nuevos
+
+# Movimiento del carrito: usar la aceleración derivada de la fuerza. Devuelve la nueva posición y velocidad
+def mover_carrito(carrito_x, velocidad_carrito, fuerza, dt=0.01, m_carrito=1):
+    # Cálculo de aceleración del carrito en función de la fuerza
+    aceleracion_carrito = fuerza / m_carrito  # Suponiendo que la fuerza es la responsable de mover el carrito
+
+    # Actualización de la velocidad del carrito con la aceleración
+    velocidad_carrito += aceleracion_carrito * dt  # Velocidad por la aceleración
+
+    # Actualización de la posición del carrito usando la fórmula de desplazamiento
+    carrito_x += (velocidad_carrito * dt + 0.5 * aceleracion_carrito * dt**2) * FACTOR_DESPLAZAMIENTO  # Desplazamiento del carrito
+
+    # Evitar que el carrito se salga de la pantalla
+    if carrito_x - CARRITO_ANCHO // 2 < 0:
+        carrito_x = CARRITO_ANCHO // 2
+    elif carrito_x + CARRITO_ANCHO // 2 > ANCHO_VENTANA:
+        carrito_x = ANCHO_VENTANA - CARRITO_ANCHO // 2
+    return carrito_x, velocidad_carrito
+
+# Posición del carrito en cada muestra (la que usa el cuadro i antes de aplicar F[i]), calculada
+# de una vez para poder dibujar cuadros sueltos sin recorrer la trayectoria
+def posiciones_carrito(y_fuerza, dt=0.01, m_carrito=1):
+    posiciones = np.empty(len(y_fuerza))
+    carrito_x, velocidad_carrito = ANCHO_VENTANA // 2, 0
+    for i, fuerza in enumerate(y_fuerza):
+        posiciones[i] = carrito_x
+        carrito_x, velocidad_carrito = mover_carrito(carrito_x, velocidad_carrito, fuerza, dt, m_carrito)
+    return posiciones
+
+# Anima muestras (t, θ en grados, F) a medida que llegan: sirve para listas ya calculadas o para
+# un generador/cola que se va llenando mientras se simula (simulacion.flujo_en_hilo).
+# Con tiempo_real=True cada cuadro muestra el instante de simulación que corresponde al reloj:
+# si hay varias muestras por cuadro se saltean (el carrito igual integra todas) y entre dos muestras
+# se interpola. Con tiempo_real=False se muestra una muestra por cuadro, como antes
+def visualizar_stream(muestras, L=0.5, dt=0.01, m_carrito=1, tiempo_real=True, fps=60):
     pygame.init()
     pantalla = pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
     pygame.display.set_caption("Simulación del péndulo invertido")
     reloj = pygame.time.Clock()
+    renderizador = Renderizador(pantalla, obtener_fuente())
 
-    # Posiciones iniciales
-    carrito_x = ANCHO_VENTANA // 2
-    carrito_y = ALTO_VENTANA - 150  # Un poco arriba del piso
-    carrito_ancho = 80
-    carrito_alto = 40
+    muestras = iter(muestras)
+    anterior = next(muestras, None)
+    if anterior is None:
+        cerrar_ventana()
+        return
+    siguiente = next(muestras, None)
 
-    # Variables para el movimiento
-    velocidad_carrito = 0  # Velocidad inicial del carrito
-    aceleracion_carrito = 0  # Aceleración inicial
+    # Posición inicial y velocidad del carrito
+    carrito_x = ANCHO_VENTANA // 2
+    velocidad_carrito = 0
+    inicio = time.perf_counter()
+    t_inicial = anterior[0]
 
-    for i, theta_deg in enumerate(y_theta):
+    while True:
         for evento in pygame.event.get():
             if evento.type == pygame.QUIT:
-                pygame.quit()
+                cerrar_ventana()
                 return
 
-        pantalla.fill(BLANCO)
-
-        # Dibujar el piso debajo del carrito
-        pygame.draw.line(pantalla, NEGRO, 
-                 (0, carrito_y + carrito_alto // 2 ), 
-                 (ANCHO_VENTANA, carrito_y + carrito_alto // 2), 5)
-
-        # Dibujar la línea del piso debajo del carrito (justo en la base del carrito)
-        pygame.draw.line(pantalla, NEGRO, 
-                         (carrito_x - carrito_ancho // 2, carrito_y + carrito_alto // 2), 
-                         (carrito_x + carrito_ancho // 2, carrito_y + carrito_alto // 2), 5)
-
-        # Carrito
-        pygame.draw.rect(pantalla, AZUL, (carrito_x - carrito_ancho // 2, carrito_y - carrito_alto // 2, carrito_ancho, carrito_alto))
-
-        # Pértiga
-        theta_rad = np.radians(theta_deg)
-        x_final = carrito_x + L * ESCALA * np.sin(theta_rad)
-        y_final = carrito_y - L * ESCALA * np.cos(theta_rad)
-
-        pygame.draw.line(pantalla, AZUL, (carrito_x, carrito_y), (x_final, y_final), 5)
-        pygame.draw.circle(pantalla, AZUL, (int(x_final), int(y_final)), 10)
-
-        # Mostrar información sobre el ángulo, fuerza y tiempo
-        texto_angulo = FUENTE.render(f"Ángulo: {np.degrees(theta_rad):.1f}°", True, NEGRO)
-        texto_fuerza = FUENTE.render(f"Fuerza: {y_fuerza[i]:.2f} N", True, NEGRO)
-        texto_tiempo = FUENTE.render(f"Tiempo: {tiempos[i]:.2f} s", True, NEGRO)
-
-        pantalla.blit(texto_angulo, (20, 20))
-        pantalla.blit(texto_fuerza, (20, 60))
-        pantalla.blit(texto_tiempo, (20, 100))
-
-        # Indicador de fuerza
-        if y_fuerza[i] != 0:
-            color_fuerza = ROJO
-            direccion = 1 if y_fuerza[i] > 0 else -1
-            longitud = min(100, abs(y_fuerza[i]) * 5)
-
-            pygame.draw.line(pantalla, color_fuerza,
-                            (carrito_x, carrito_y + 20),
-                            (carrito_x + direccion * longitud, carrito_y + 20), 5)
-            pygame.draw.polygon(pantalla, color_fuerza, [
-                (carrito_x + direccion * longitud, carrito_y + 15),
-                (carrito_x + direccion * longitud, carrito_y + 25),
-                (carrito_x + direccion * (longitud + 10), carrito_y + 20)
-            ])
-
-        # Movimiento del carrito: usar la aceleración derivada de la fuerza
-        # Cálculo de aceleración del carrito en función de la fuerza
-        aceleracion_carrito = y_fuerza[i] / m_carrito  # Suponiendo que la fuerza es la responsable de mover el carrito
-
-        # Actualización de la velocidad del carrito con la aceleración
-        velocidad_carrito += aceleracion_carrito * dt  # Velocidad por la aceleración
-
-        # Actualización de la posición del carrito usando la fórmula de desplazamiento
-        carrito_x += (velocidad_carrito * dt + 0.5 * aceleracion_carrito * dt**2) * FACTOR_DESPLAZAMIENTO  # Desplazamiento del carrito
-
-        # Evitar que el carrito se salga de la pantalla
-        if carrito_x - carrito_ancho // 2 < 0:
-            carrito_x = carrito_ancho // 2
-        elif carrito_x + carrito_ancho // 2 > ANCHO_VENTANA:
-            carrito_x = ANCHO_VENTANA - carrito_ancho // 2
+        t_objetivo = t_inicial + (time.perf_counter() - inicio) if tiempo_real else anterior[0]
 
-        pygame.display.flip()
-        reloj.tick(60)  # 60 FPS
+        # Avanzar hasta la última muestra que ya "ocurrió" en tiempo de reloj
+        while siguiente is not None and siguiente[0] <= t_objetivo:
+            carrito_x, velocidad_carrito = mover_carrito(carrito_x, velocidad_carrito, anterior[2], dt, m_carrito)
+            anterior, siguiente = siguiente, next(muestras, None)
 
-    pygame.quit()
+        t, theta_deg, fuerza = anterior
+        x = carrito_x
+        if siguiente is not None and tiempo_real:
+            fraccion = min(1.0, (t_objetivo - anterior[0]) / (siguiente[0] - anterior[0]))
+            theta_deg += fraccion * ((siguiente[1] - anterior[1] + 180) % 360 - 180) # camino corto en ±180°
+            fuerza += fraccion * (siguiente[2] - anterior[2])
+            t = t_objetivo
+            x_siguiente, _ = mover_carrito(carrito_x, velocidad_carrito, anterior[2], dt, m_carrito)
+            x += fraccion * (x_siguiente - carrito_x)
+
+        renderizador.dibujar(x, (theta_deg + 180) % 360 - 180, fuerza, t, L)
+        reloj.tick(fps)
+
+        if siguiente is None:
+            break
+        if not tiempo_real:
+            carrito_x, velocidad_carrito = mover_carrito(carrito_x, velocidad_carrito, anterior[2], dt, m_carrito)
+            anterior, siguiente = siguiente, next(muestras, None)
+
+    cerrar_ventana()
+
+# Función para visualizar la simulación en tiempo real
+def visualizar_en_tiempo_real(y_theta, y_fuerza, tiempos, L=0.5, dt=0.01, m_carrito=1, tiempo_real=True, fps=60):
+    visualizar_stream(zip(tiempos, y_theta, y_fuerza), L, dt, m_carrito, tiempo_real, fps)
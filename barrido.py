@@ -0,0 +1,61 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from especificacion import cargar_controlador
+from simulacion import CONSTANTE_M, CONSTANTE_m, CONSTANTE_l, simular_lote
+
+# Controlador de cada proceso del pool (se crea una sola vez por proceso en _iniciar_proceso)
+_controller = None
+
+def _iniciar_proceso(modo):
+    global _controller
+    _controller = cargar_controlador("pendulo_final", modo=modo) # lo compilado sale de la cache en disco
+
+# Una tarea = una combinación de constantes físicas y un bloque de condiciones iniciales
+def _simular_tarea(tarea):
+    M, m, l, theta_0, v_0, t_max, delta_t, tolerancia, permanencia = tarea
+    *_, metricas = simular_lote(_controller, t_max, delta_t, theta_0, v_0, M, m, l,
+                                metricas=True, tolerancia=tolerancia, permanencia=permanencia)
+    return metricas
+
+# Barre la grilla completa de condiciones iniciales (theta_0 en grados, v_0) y de constantes
+# del carro-péndulo repartiendo las simulaciones en un pool de procesos. Los resultados quedan en
+# arrays de forma (len(M), len(m), len(l), len(theta_0), len(v_0)) y se guardan comprimidos en archivo
+def barrido(theta_0, v_0, M=(CONSTANTE_M,), m=(CONSTANTE_m,), l=(CONSTANTE_l,), t_max=5, delta_t=0.01,
+            tolerancia=2.0, permanencia=1.0, procesos=None, archivo="barrido.npz", modo="compilado"):
+    theta_0, v_0 = np.asarray(theta_0, dtype=float), np.asarray(v_0, dtype=float)
+    M, m, l = np.atleast_1d(M).astype(float), np.atleast_1d(m).astype(float), np.atleast_1d(l).astype(float)
+    procesos = procesos or os.cpu_count()
+
+    # Cada combinación de constantes se parte en bloques para ocupar todos los núcleos
+    T0, V0 = np.meshgrid(theta_0, v_0, indexing="ij")
+    bloques = np.array_split(np.arange(T0.size), max(1, procesos // (len(M) * len(m) * len(l))))
+    bloques = [b for b in bloques if len(b)]
+    combinaciones = list(itertools.product(M, m, l))
+    tareas = [(Mi, mi, li, T0.ravel()[b], V0.ravel()[b], t_max, delta_t, tolerancia, permanencia)
+              for Mi, mi, li in combinaciones for b in bloques]
+
+    cargar_controlador("pendulo_final", modo=modo) # compila una vez acá si la cache está vacía
+    with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso, initargs=(modo,)) as pool:
+        parciales = list(pool.map(_simular_tarea, tareas))
+
+    forma = (len(M), len(m), len(l), len(theta_0), len(v_0))
+    resultados = {}
+    for clave in parciales[0]:
+        resultados[clave] = np.concatenate([p[clave] for p in parciales]).reshape(forma)
+
+    if archivo:
+        np.savez_compressed(archivo, theta_0=theta_0, v_0=v_0, M=M, m=m, l=l,
+                            t_max=t_max, delta_t=delta_t, tolerancia=tolerancia, permanencia=permanencia, **resultados)
+    return resultados
+
+
+if __name__ == "__main__":
+    resultados = barrido(theta_0=np.linspace(-180, 180, 37), v_0=np.linspace(-5, 5, 11),
+                         M=(0.5, 1, 2), l=(0.25, 0.5, 1), tolerancia=15)
+    estabilizado = resultados["estabilizado"]
+    print(f"Trayectorias estabilizadas: {estabilizado.sum()} de {estabilizado.size}")
+    print("Tiempo de establecimiento medio (s):", np.nanmean(resultados["tiempo_establecimiento"]))
@@ -0,0 +1,137 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+import controlador_pendulo
+import controlador_pendulo_FINAL
+from simulacion import simular_lote
+
+# Cada medición corre `funcion` `numero` veces y se repite `repeticiones` veces; se guarda la
+# mejor repetición (la menos afectada por el resto del sistema) como segundos por llamada
+def medir(funcion, numero, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / numero)
+    return min(tiempos)
+
+def _latencia_infer(controller, estados, numero, repeticiones):
+    it = iter(np.tile(estados, (numero * repeticiones // len(estados) + 1, 1)).tolist())
+    return medir(lambda: controller.infer(*next(it)), numero, repeticiones)
+
+# Devuelve {nombre: {"valor", "unidad", "mayor_es_mejor"}}
+def correr_benchmarks(rapido=False):
+    resultados = {}
+    repeticiones = 3 if rapido else 5
+    rng = np.random.default_rng(0)
+    estados = np.column_stack([rng.uniform(-np.pi, np.pi, 64), rng.uniform(-10, 10, 64)])
+
+    def latencia(nombre, segundos):
+        resultados[nombre] = {"valor": segundos * 1e6, "unidad": "us/llamada", "mayor_es_mejor": False}
+
+    def throughput(nombre, por_segundo, unidad):
+        resultados[nombre] = {"valor": por_segundo, "unidad": unidad, "mayor_es_mejor": True}
+
+    # Latencia de infer en cada modo del controlador en radianes
+    modos = {
+        "discreto": lambda c: c,
+        "compilado": lambda c: c.compilar(),
+        "analitico": lambda c: c.compilar_analitico(),
+        "sugeno": lambda c: c.compilar_sugeno(),
+        "tabla": lambda c: c.compilar_tabla(),
+    }
+    for modo, preparar in modos.items():
+        controller = preparar(controlador_pendulo_FINAL.crear_controlador())
+        numero = 5 if modo == "discreto" else 500
+        latencia(f"infer_{modo}", _latencia_infer(controller, estados, numero, repeticiones))
+
+    # Cache: consultas repetidas de un ciclo cerrado (todas aciertan después de la primera vuelta)
+    controller = controlador_pendulo_FINAL.crear_controlador().compilar().activar_cache()
+    latencia("infer_compilado_cache", _latencia_infer(controller, estados, 500, repeticiones))
+
+    # infer_batch: estados por segundo
+    controller = controlador_pendulo_FINAL.crear_controlador().compilar()
+    theta, theta_dot = rng.uniform(-np.pi, np.pi, 4096), rng.uniform(-10, 10, 4096)
+    throughput("infer_batch_compilado", 4096 / medir(lambda: controller.infer_batch(theta, theta_dot), 1, repeticiones), "estados/s")
+
+    # Controlador en grados (controlador_pendulo.py) contra el de radianes
+    viejo = controlador_pendulo.crear_controlador()
+    estados_grados = np.column_stack([np.degrees(estados[:, 0]), estados[:, 1]])
+    latencia("infer_grados_discreto", _latencia_infer(viejo, estados_grados, 5, repeticiones))
+
+    # FuzzySet.membership: escalar y sobre arrays
+    conjunto = controlador_pendulo_FINAL.crear_controlador().force_var.sets["NP"]
+    xs = rng.uniform(-30, 30, 100_000)
+    valores = iter(np.tile(xs[:1000], 100).tolist())
+    throughput("membership_escalar", 1 / medir(lambda: conjunto.membership(next(valores)), 10_000, repeticiones), "llamadas/s")
+    throughput("membership_array", xs.size / medir(lambda: conjunto.membership(xs), 1, repeticiones), "puntos/s")
+
+    # Simulación: pasos por segundo de simular y del motor por lotes
+    import ProgramaPrincipal_FINAL
+    t_max = 1 if rapido else 5
+    pasos = len(np.arange(0, t_max, 0.01))
+    throughput("simular", pasos / medir(lambda: ProgramaPrincipal_FINAL.simular(t_max, 0.01, -90, 0, 0), 1, repeticiones), "pasos/s")
+    theta_0 = np.linspace(-180, 180, 256)
+    throughput("simular_lote_compilado", 256 * pasos / medir(lambda: simular_lote(controller, t_max, 0.01, theta_0, 0), 1, repeticiones),
+               "estados*pasos/s")
+    return resultados
+
+# Compara contra la línea base; devuelve las métricas que empeoraron más que la tolerancia (fracción)
+def comparar(resultados, baseline, tolerancia=0.25):
+    regresiones = {}
+    for nombre, medicion in resultados.items():
+        if nombre not in baseline:
+            continue
+        base = baseline[nombre]["valor"]
+        cambio = medicion["valor"] / base - 1
+        if not medicion["mayor_es_mejor"]:
+            cambio = -cambio
+        if cambio < -tolerancia:
+            regresiones[nombre] = {"baseline": base, "actual": medicion["valor"], "cambio": cambio}
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de inferencia difusa y simulación")
+    parser.add_argument("--salida", default="bench_resultados.json")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--guardar-baseline", action="store_true", help="guarda estos resultados como línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento admitido (0.25 = 25%%)")
+    parser.add_argument("--rapido", action="store_true", help="menos repeticiones y simulaciones más cortas")
+    parser.add_argument("--requerir-baseline", action="store_true",
+                        help="falla si no hay línea base (para CI: sin ella no se detectan regresiones)")
+    args = parser.parse_args()
+
+    resultados = correr_benchmarks(args.rapido)
+    datos = {
+        "entorno": {"python": platform.python_version(), "numpy": np.__version__, "maquina": platform.platform()},
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    for nombre, medicion in resultados.items():
+        print(f"{nombre:28s} {medicion['valor']:14.2f} {medicion['unidad']}")
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["resultados"]
+    except FileNotFoundError:
+        print(f"No hay línea base en {args.baseline}; correr con --guardar-baseline para crearla")
+        sys.exit(2 if args.requerir_baseline else 0)
+
+    regresiones = comparar(resultados, baseline, args.tolerancia)
+    for nombre, r in regresiones.items():
+        print(f"REGRESIÓN {nombre}: {r['baseline']:.2f} -> {r['actual']:.2f} ({r['cambio']:+.0%})")
+    sys.exit(1 if regresiones else 0)
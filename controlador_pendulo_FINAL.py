@@ -1,6 +1,9 @@
 
+import json
+import time
+from collections import Counter, OrderedDict
+
 import numpy as np
-import matplotlib.pyplot as plt
 
 class FuzzySet:
     def __init__(self, name, *points):
@@ -8,6 +11,8 @@ class FuzzySet:
         self.points = points
 
     def membership(self, x):
+        if np.ndim(x) > 0: # arrays: misma función con operaciones vectorizadas
+            return self._membership_array(x)
         if len(self.points) == 3: # Triangular 
             a, b, c = self.points
             if x <= a or x >= c: 
@@ -41,6 +46,41 @@ class FuzzySet:
                     return 0
         return 0 # porque si no se chotea
 
+    # Tramos con pendiente de la función (x0, μ0, x1, μ1); los tramos planos no hacen falta
+    def segmentos(self):
+        if len(self.points) == 3:
+            a, b, c = self.points
+            return [(a, 0, b, 1), (b, 1, c, 0)]
+        elif len(self.points) == 4 and self.points[1] < 0:
+            a, b, c, d = self.points
+            return [(c, 1, d, 0)]
+        elif len(self.points) == 4 and self.points[1] > 0:
+            a, b, c, d = self.points
+            return [(a, 0, b, 1)]
+        return []
+
+    # Versión vectorizada de membership: cada rama del caso escalar es una máscara, con las
+    # mismas comparaciones y las mismas cuentas, así que da exactamente los mismos valores
+    def _membership_array(self, x):
+        x = np.asarray(x, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if len(self.points) == 3: # Triangular
+                a, b, c = self.points
+                subida = (a < x) & (x <= b)
+                bajada = (b < x) & (x < c)
+                return np.where(subida, (x - a) / (b - a), np.where(bajada, (c - x) / (c - b), 0.0))
+            elif len(self.points) == 4 and self.points[1] < 0: # medio trapecio izquierdo
+                a, b, c, d = self.points
+                plano = (a <= x) & (x <= b) & (x < d)
+                bajada = (c < x) & (x < d)
+                return np.where(plano, 1.0, np.where(bajada, (d - x) / (d - c), 0.0))
+            elif len(self.points) == 4 and self.points[1] > 0: # medio trapecio derecho
+                a, b, c, d = self.points
+                subida = (a < x) & (x < b)
+                plano = (c <= x) & (x <= d) & (x > a)
+                return np.where(subida, (x - a) / (b - a), np.where(plano, 1.0, 0.0))
+        return np.zeros_like(x)
+
 class FuzzyVariable:
     def __init__(self, name, sets):
         self.name = name
@@ -49,6 +89,10 @@ class FuzzyVariable:
     def fuzzify(self, x):
         return {name: fs.membership(x) for name, fs in self.sets.items()}
 
+    # Pertenencias de un array de x: una fila por conjunto, en el orden de self.sets
+    def fuzzify_array(self, x):
+        return np.array([fs.membership(np.asarray(x, dtype=float)) for fs in self.sets.values()])
+
 class FuzzyRule:
     def __init__(self, antecedent1, antecedent2, consequent):
         self.antecedent1 = antecedent1 #conjunto de tita (ej: NP)
@@ -60,6 +104,53 @@ class FuzzyRule:
         μ2 = theta_dot_memberships[self.antecedent2]
         return min(μ1, μ2), self.consequent
 
+# Tiempos por etapa de infer (acumulado y de la última llamada) y reglas disparadas por llamada
+class EstadisticasInferencia:
+    ETAPAS = ("circularidad", "cache", "fuzzificacion", "reglas", "agregacion", "defuzzificacion", "interpolacion")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.llamadas = 0
+        self.tiempo_acumulado = {etapa: 0.0 for etapa in self.ETAPAS}
+        self.tiempo_ultima = {etapa: 0.0 for etapa in self.ETAPAS}
+        self.reglas_disparadas = Counter() # cantidad de reglas disparadas -> cantidad de llamadas
+        self.activaciones_por_regla = Counter() # (antecedente θ, antecedente θ') -> veces que disparó
+
+    def iniciar(self):
+        self.llamadas += 1
+        for etapa in self.tiempo_ultima:
+            self.tiempo_ultima[etapa] = 0.0
+        self._t = time.perf_counter()
+
+    # Suma el tiempo transcurrido desde la marca anterior a la etapa indicada
+    def marcar(self, etapa):
+        ahora = time.perf_counter()
+        self.tiempo_ultima[etapa] += ahora - self._t
+        self.tiempo_acumulado[etapa] += ahora - self._t
+        self._t = ahora
+
+    def registrar_reglas(self, disparadas):
+        self.reglas_disparadas[len(disparadas)] += 1
+        self.activaciones_por_regla.update(disparadas)
+
+    def volcar(self, archivo=None):
+        total_reglas = sum(n * veces for n, veces in self.reglas_disparadas.items())
+        datos = {
+            "llamadas": self.llamadas,
+            "tiempo_acumulado": dict(self.tiempo_acumulado),
+            "tiempo_medio": {e: t / self.llamadas if self.llamadas else 0.0 for e, t in self.tiempo_acumulado.items()},
+            "tiempo_ultima": dict(self.tiempo_ultima),
+            "reglas_disparadas_medio": total_reglas / max(1, sum(self.reglas_disparadas.values())),
+            "histograma_reglas_disparadas": {str(n): veces for n, veces in sorted(self.reglas_disparadas.items())},
+            "activaciones_por_regla": {f"{a1}/{a2}": veces for (a1, a2), veces in self.activaciones_por_regla.most_common()},
+        }
+        if archivo:
+            with open(archivo, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=2, ensure_ascii=False)
+        return datos
+
 class FuzzyController:
     def __init__(self, theta_var, theta_dot_var, force_var, rules):
         self.theta_var = theta_var # posicion
@@ -69,8 +160,174 @@ class FuzzyController:
         self.last_output_memberships = {} #para desp graficar
         self.last_centroid = 0
         self.last_inputs = (0, 0)
+        self.modo = "discreto" # "discreto" (original), "compilado", "tabla", "analitico" o "sugeno"
+        self.rango_fuerza = (-30, 30) # dominio de salida sobre el que se calcula el centroide
+        self.indice_fuerza = {label: i for i, label in enumerate(force_var.sets)}
+        self.cache = None # memoización opcional de infer (ver activar_cache)
+        self.perfil = None # EstadisticasInferencia cuando el perfilado está activo
+        self.inspector = None # figura de graficar_resultado
+        self._indexar_reglas()
+
+    # Índices de cada regla para evaluar muchas entradas a la vez (infer_batch)
+    def _indexar_reglas(self):
+        theta_labels = list(self.theta_var.sets)
+        theta_dot_labels = list(self.theta_dot_var.sets)
+        force_labels = list(self.force_var.sets)
+        self.indices_reglas = np.array([(theta_labels.index(r.antecedent1), theta_dot_labels.index(r.antecedent2),
+                                         force_labels.index(r.consequent)) for r in self.rules], dtype=int).reshape(-1, 3)
+
+        # Base de reglas indexada: tabla_reglas[i][j] = consecuente de (θ_i, θ'_j), -1 si no hay regla
+        self.tabla_reglas = [[-1] * len(theta_dot_labels) for _ in theta_labels]
+        for i, j, k in self.indices_reglas:
+            if self.tabla_reglas[i][j] not in (-1, k):
+                raise ValueError(f"Reglas contradictorias para ({theta_labels[i]}, {theta_dot_labels[j]})")
+            self.tabla_reglas[i][j] = int(k)
+
+    # Reemplaza la base de reglas y descarta todo lo que dependía de la anterior
+    def actualizar_reglas(self, rules):
+        self.rules = rules
+        self._indexar_reglas()
+        if self.modo == "tabla":
+            eje_theta, eje_theta_dot = self.ejes_tabla
+            self.compilar_tabla(len(eje_theta), len(eje_theta_dot), rango_theta_dot=(eje_theta_dot[0], eje_theta_dot[-1]))
+        self.invalidar_cache()
+
+    # Cache LRU de infer: las entradas se cuantizan a múltiplos de `resolucion` y la inferencia se
+    # hace en ese punto de la grilla, así el resultado no depende del orden de las consultas
+    def activar_cache(self, resolucion=1e-3, tamano_maximo=4096):
+        self.cache = OrderedDict()
+        self.cache_resolucion = resolucion
+        self.cache_tamano_maximo = tamano_maximo
+        self.cache_stats = {"aciertos": 0, "fallos": 0, "desalojos": 0}
+        return self
+
+    def desactivar_cache(self):
+        self.cache = None
+
+    # Mide cada etapa de infer; desactivado, el costo es una comparación con None por etapa
+    def activar_perfilado(self):
+        self.perfil = EstadisticasInferencia()
+        return self.perfil
+
+    def desactivar_perfilado(self):
+        self.perfil = None
+
+    # Hay que llamarla si se modifican a mano los conjuntos o las reglas con la cache activa
+    def invalidar_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+    # Precalcula las curvas de pertenencia de la fuerza como arrays de NumPy
+    def _precalcular_curvas(self, n_puntos=1000):
+        self.x_fuerza = np.linspace(*self.rango_fuerza, n_puntos) # mismo eje que usa infer
+        self.curvas_fuerza = self.force_var.fuzzify_array(self.x_fuerza)
+
+    def compilar(self, n_puntos=1000):
+        self._precalcular_curvas(n_puntos)
+        self.modo = "compilado"
+        self.invalidar_cache()
+        return self
+
+    # Centroide exacto sin grilla: la salida agregada es lineal a tramos, así que alcanza con
+    # conocer sus quiebres. Los que no dependen de las activaciones (vértices de los conjuntos y
+    # cruces entre sus pendientes) se calculan acá; los cortes con cada nivel de activación, en cada llamada.
+    # infer_batch arma los quiebres de todos los estados a la vez y rinde como compilado; infer de a un
+    # estado paga ~20 operaciones de numpy chicas y queda 2-3 veces más lento que compilado
+    def compilar_analitico(self):
+        x_min, x_max = self.rango_fuerza
+        self.segmentos_fuerza = np.array([seg for fs in self.force_var.sets.values() for seg in fs.segmentos()], dtype=float)
+        quiebres = [x_min, x_max] + [p for fs in self.force_var.sets.values() for p in fs.points]
+
+        for i, (x0, y0, x1, y1) in enumerate(self.segmentos_fuerza):
+            for u0, v0, u1, v1 in self.segmentos_fuerza[i + 1:]:
+                m1, m2 = (y1 - y0) / (x1 - x0), (v1 - v0) / (u1 - u0)
+                if m1 != m2:
+                    x = (v0 - y0 + m1 * x0 - m2 * u0) / (m1 - m2)
+                    if max(x0, u0) <= x <= min(x1, u1):
+                        quiebres.append(x)
+
+        quiebres = np.array(quiebres, dtype=float)
+        self.quiebres_fuerza = np.unique(quiebres[(quiebres >= x_min) & (quiebres <= x_max)])
+
+        # Entre dos quiebres cada conjunto es una recta: se guarda su pendiente y ordenada
+        # muestreando dos puntos interiores, para después evaluarlo sin ramas
+        ancho = np.diff(self.quiebres_fuerza)
+        x_a = self.quiebres_fuerza[:-1] + ancho / 3
+        x_b = self.quiebres_fuerza[:-1] + 2 * ancho / 3
+        μ_a, μ_b = self.force_var.fuzzify_array(x_a), self.force_var.fuzzify_array(x_b)
+        self.pendientes_fuerza = (μ_b - μ_a) / (x_b - x_a)
+        self.ordenadas_fuerza = μ_a - self.pendientes_fuerza * x_a
+
+        # Para cortar cada segmento con un nivel: x = x0 + (nivel - y0) · Δx/Δy, dentro del segmento
+        x0, y0, x1, y1 = self.segmentos_fuerza.T
+        self.cortes_fuerza = np.array([x0, y0, (x1 - x0) / (y1 - y0), np.maximum(np.minimum(x0, x1), x_min),
+                                       np.minimum(np.maximum(x0, x1), x_max)])
+        self.modo = "analitico"
+        self.invalidar_cache()
+        return self
+
+    # Centroide de cada conjunto de F sobre el dominio de salida: los singletons que más se
+    # parecen a la salida de Mamdani
+    def singletons_desde_centroides(self, n_puntos=10001):
+        x = np.linspace(*self.rango_fuerza, n_puntos)
+        curvas = self.force_var.fuzzify_array(x)
+        return {label: float(np.dot(x, μ) / μ.sum()) for label, μ in zip(self.force_var.sets, curvas)}
+
+    # Inferencia de Takagi-Sugeno: cada conjunto de F se reemplaza por una función de las entradas
+    # F_k = c0 + c1·θ + c2·θ' y la salida es el promedio de las reglas pesado por su activación,
+    # sin eje de salida. `consecuentes` mapea etiquetas a un singleton c0 o a (c0, c1, c2); las
+    # etiquetas que no aparecen usan el centroide de su conjunto de F
+    def compilar_sugeno(self, consecuentes=None):
+        desconocidas = set(consecuentes or ()) - set(self.indice_fuerza)
+        if desconocidas:
+            raise ValueError(f"Etiquetas de F desconocidas: {sorted(desconocidas)}")
+        consecuentes = {**self.singletons_desde_centroides(), **(consecuentes or {})}
+        coeficientes = np.zeros((len(self.force_var.sets), 3))
+        for label, c in consecuentes.items():
+            if np.ndim(c) and np.size(c) != 3:
+                raise ValueError(f"El consecuente de {label} tiene que ser c0 o (c0, c1, c2)")
+            coeficientes[self.indice_fuerza[label]] = c if np.ndim(c) else (c, 0, 0)
+        self.coeficientes_sugeno = coeficientes
+        self.modo = "sugeno"
+        self.invalidar_cache()
+        return self
+
+    # Precalcula la superficie de control θ×θ' -> F sobre [-π, π] × [-10, 10] y pasa a
+    # interpolarla bilinealmente. El error contra la inferencia exacta (medido en el centro
+    # de cada celda, donde la interpolación es peor) queda en self.error_tabla
+    def compilar_tabla(self, n_theta=201, n_theta_dot=201, rango_theta_dot=(-10, 10)):
+        self.ejes_tabla = (np.linspace(-np.pi, np.pi, n_theta),
+                           np.linspace(rango_theta_dot[0], rango_theta_dot[1], n_theta_dot))
+        eje_theta, eje_theta_dot = self.ejes_tabla
+        self.tabla = self._infer_batch_exacto(eje_theta[:, None], eje_theta_dot[None, :])
+
+        centros_theta = (eje_theta[:-1] + eje_theta[1:]) / 2
+        centros_theta_dot = (eje_theta_dot[:-1] + eje_theta_dot[1:]) / 2
+        exacto = self._infer_batch_exacto(centros_theta[:, None], centros_theta_dot[None, :])
+        self.modo = "tabla"
+        error = np.abs(self.infer_batch(centros_theta[:, None], centros_theta_dot[None, :]) - exacto)
+        self.error_tabla = {"error_max": float(error.max()), "error_medio": float(error.mean())}
+        self.invalidar_cache()
+        return self
+
+    # Interpolación bilineal en la tabla; devuelve None si el punto cae fuera de ella
+    def _interpolar_tabla(self, theta_val, theta_dot_val):
+        eje_theta, eje_theta_dot = self.ejes_tabla
+        if not (eje_theta[0] <= theta_val <= eje_theta[-1] and eje_theta_dot[0] <= theta_dot_val <= eje_theta_dot[-1]):
+            return None
+        u = (theta_val - eje_theta[0]) / (eje_theta[1] - eje_theta[0])
+        v = (theta_dot_val - eje_theta_dot[0]) / (eje_theta_dot[1] - eje_theta_dot[0])
+        i = min(int(u), len(eje_theta) - 2)
+        j = min(int(v), len(eje_theta_dot) - 2)
+        fu, fv = u - i, v - j
+        T = self.tabla
+        return float((T[i, j] * (1 - fu) + T[i + 1, j] * fu) * (1 - fv) +
+                     (T[i, j + 1] * (1 - fu) + T[i + 1, j + 1] * fu) * fv)
 
     def infer(self, theta_val, theta_dot_val):
+        perfil = self.perfil
+        if perfil is not None:
+            perfil.iniciar()
 
         # Aplicar circularidad a theta
         if theta_val > np.pi:
@@ -79,107 +336,361 @@ class FuzzyController:
             theta_val += 2 * np.pi
 
         self.last_inputs = (theta_val, theta_dot_val) # para graficar
+        if perfil is not None:
+            perfil.marcar("circularidad")
+
+        if self.cache is not None:
+            clave = (round(theta_val / self.cache_resolucion), round(theta_dot_val / self.cache_resolucion))
+            fuerza = self.cache.get(clave)
+            if fuerza is not None:
+                self.cache.move_to_end(clave)
+                self.cache_stats["aciertos"] += 1
+                self.last_centroid = fuerza
+                if perfil is not None:
+                    perfil.marcar("cache")
+                    perfil.registrar_reglas(())
+                return fuerza
+            self.cache_stats["fallos"] += 1
+            if perfil is not None:
+                perfil.marcar("cache")
+            fuerza = self._inferir(clave[0] * self.cache_resolucion, clave[1] * self.cache_resolucion)
+            self.cache[clave] = fuerza
+            if len(self.cache) > self.cache_tamano_maximo:
+                self.cache.popitem(last=False)
+                self.cache_stats["desalojos"] += 1
+            return fuerza
+
+        return self._inferir(theta_val, theta_dot_val)
+
+    def _inferir(self, theta_val, theta_dot_val):
+        perfil = self.perfil
+        if self.modo == "tabla":
+            fuerza = self._interpolar_tabla(theta_val, theta_dot_val)
+            if perfil is not None:
+                perfil.marcar("interpolacion")
+            if fuerza is not None:
+                self.last_centroid = fuerza
+                if perfil is not None:
+                    perfil.registrar_reglas(())
+                return fuerza
+            return self._infer_compilado(theta_val, theta_dot_val) # fuera de la tabla: inferencia exacta
+        if self.modo == "compilado":
+            return self._infer_compilado(theta_val, theta_dot_val)
+        if self.modo == "analitico":
+            return self._infer_analitico(theta_val, theta_dot_val)
+        if self.modo == "sugeno":
+            return self._infer_sugeno(theta_val, theta_dot_val)
+
         μ_theta = self.theta_var.fuzzify(theta_val)
         μ_theta_dot = self.theta_dot_var.fuzzify(theta_dot_val)
+        if perfil is not None:
+            perfil.marcar("fuzzificacion")
+
+        evaluadas = [(rule, *rule.evaluate(μ_theta, μ_theta_dot)) for rule in self.rules]
+        if perfil is not None:
+            perfil.marcar("reglas")
+            perfil.registrar_reglas([(r.antecedent1, r.antecedent2) for r, activation, _ in evaluadas if activation > 0])
 
         output_memberships = {x: 0 for x in np.linspace(-30, 30, 1000)}
 
-        for rule in self.rules: # crea el eje de salida de F con 1000 puntos
-            activation, label = rule.evaluate(μ_theta, μ_theta_dot)
+        for _, activation, label in evaluadas: # crea el eje de salida de F con 1000 puntos
             fuzzy_set = self.force_var.sets[label]
             for x in output_memberships:
                 μ = min(activation, fuzzy_set.membership(x))
                 output_memberships[x] = max(output_memberships[x], μ)
         
         self.last_output_memberships = output_memberships #para desp graficar
+        if perfil is not None:
+            perfil.marcar("agregacion")
         
         # Defuzzificación por el método del centroide
         num = sum(x * μ for x, μ in output_memberships.items())
         den = sum(μ for μ in output_memberships.values())
         self.last_centroid = num / den if den != 0 else 0
+        if perfil is not None:
+            perfil.marcar("defuzzificacion")
+        return self.last_centroid
+
+    # Misma inferencia que infer pero recortando y agregando con operaciones de arrays
+    def _infer_compilado(self, theta_val, theta_dot_val):
+        activaciones = self._activaciones_consecuente(theta_val, theta_dot_val)
+
+        salida = np.zeros_like(self.x_fuerza)
+        for k in np.flatnonzero(activaciones): # solo los conjuntos de F que dispararon
+            np.maximum(salida, np.minimum(activaciones[k], self.curvas_fuerza[k]), out=salida)
+        if self.perfil is not None:
+            self.perfil.marcar("agregacion")
+
+        # Defuzzificación por el método del centroide
+        den = salida.sum()
+        self.last_centroid = float(np.dot(self.x_fuerza, salida) / den) if den != 0 else 0
+        if self.perfil is not None:
+            self.perfil.marcar("defuzzificacion")
+        return self.last_centroid
+
+    # Activación de cada conjunto de F: las reglas con el mismo consecuente se combinan con max.
+    # Solo se recorren las celdas de tabla_reglas cuyos dos antecedentes tienen pertenencia > 0
+    def _activaciones_consecuente(self, theta_val, theta_dot_val):
+        perfil = self.perfil
+        activos_theta = [(i, μ) for i, fs in enumerate(self.theta_var.sets.values()) if (μ := fs.membership(theta_val)) > 0]
+        activos_theta_dot = [(j, μ) for j, fs in enumerate(self.theta_dot_var.sets.values()) if (μ := fs.membership(theta_dot_val)) > 0]
+        if perfil is not None:
+            perfil.marcar("fuzzificacion")
+
+        activaciones = [0.0] * len(self.force_var.sets)
+        for i, μ1 in activos_theta:
+            fila = self.tabla_reglas[i]
+            for j, μ2 in activos_theta_dot:
+                k = fila[j]
+                if k >= 0 and min(μ1, μ2) > activaciones[k]:
+                    activaciones[k] = min(μ1, μ2)
+
+        if perfil is not None:
+            perfil.marcar("reglas")
+            nombres_theta, nombres_theta_dot = list(self.theta_var.sets), list(self.theta_dot_var.sets)
+            perfil.registrar_reglas([(nombres_theta[i], nombres_theta_dot[j]) for i, _ in activos_theta
+                                     for j, _ in activos_theta_dot if self.tabla_reglas[i][j] >= 0])
+        return np.array(activaciones)
+
+    def _infer_analitico(self, theta_val, theta_dot_val):
+        activaciones = self._activaciones_consecuente(theta_val, theta_dot_val)
+        self.last_centroid = self._centroide_analitico(activaciones, self.perfil)
+        return self.last_centroid
+
+    # Centroide exacto de la salida agregada para las activaciones de cada conjunto de F. No toca
+    # el estado del controlador (last_*), así lo puede usar infer_batch
+    def _centroide_analitico(self, activaciones, perfil=None):
+        activaciones = np.asarray(activaciones, dtype=float)[None]
+        # Con un solo estado solo se cortan los niveles > 0 (en general 2 o 3 de los 5)
+        return float(self._centroides_analiticos(activaciones, perfil, activaciones[activaciones > 0][None])[0])
+
+    # Lo mismo para muchos estados a la vez: activaciones (N, conjuntos de F) -> centroides (N,).
+    # `niveles` (N, L) son los niveles de recorte donde cortar las pendientes, por defecto todos
+    def _centroides_analiticos(self, activaciones, perfil=None, niveles=None):
+        # Cortes de cada pendiente con cada nivel de recorte. Los que caen fuera de su segmento se
+        # llevan al extremo, que ya es un quiebre (queda un tramo de ancho 0 que no suma nada)
+        x0, y0, x_por_nivel, desde, hasta = self.cortes_fuerza
+        niveles = activaciones if niveles is None else niveles
+        cortes = np.minimum(np.maximum(x0 + (niveles[:, :, None] - y0) * x_por_nivel, desde), hasta)
+        n_fijos = len(self.quiebres_fuerza)
+        quiebres = np.empty((len(activaciones), n_fijos + cortes[0].size))
+        quiebres[:, :n_fijos] = self.quiebres_fuerza
+        quiebres[:, n_fijos:] = cortes.reshape(len(activaciones), -1)
+        quiebres.sort(axis=1)
+
+        # Entre quiebres la salida es una recta: se evalúa en dos puntos interiores de cada tramo
+        # (así no importan los saltos en los extremos) y se integran área y momento exactos. Un
+        # tramo de ancho 0 en x_min cae en el tramo -1, da igual porque se multiplica por 0
+        ancho = quiebres[:, 1:] - quiebres[:, :-1]
+        medio = quiebres[:, :-1] + ancho / 2
+        puntos = np.concatenate([medio, medio + ancho / 4], axis=1)
+        tramo = np.searchsorted(self.quiebres_fuerza, puntos) - 1
+        μ = self.ordenadas_fuerza[:, tramo] + self.pendientes_fuerza[:, tramo] * puntos # (conjuntos, N, puntos)
+        salida = np.minimum(activaciones.T[:, :, None], μ).max(axis=0)
+        f_medio, f_cuarto = salida[:, :ancho.shape[1]], salida[:, ancho.shape[1]:]
+        if perfil is not None:
+            perfil.marcar("agregacion")
+
+        # pendiente · ancho³ / 12 con pendiente = (f_cuarto - f_medio) / (ancho / 4), sin dividir
+        # por los tramos de ancho 0
+        area = (ancho * f_medio).sum(axis=1)
+        momento = (ancho * (medio * f_medio + ancho * (f_cuarto - f_medio) / 3)).sum(axis=1)
+        centroides = momento / np.where(area != 0, area, np.inf) # sin ninguna regla activa, 0
+        if perfil is not None:
+            perfil.marcar("defuzzificacion")
+        return centroides
+
+    # Promedio pesado sobre las celdas de tabla_reglas con los dos antecedentes activos: O(reglas)
+    def _infer_sugeno(self, theta_val, theta_dot_val):
+        perfil = self.perfil
+        activos_theta = [(i, μ) for i, fs in enumerate(self.theta_var.sets.values()) if (μ := fs.membership(theta_val)) > 0]
+        activos_theta_dot = [(j, μ) for j, fs in enumerate(self.theta_dot_var.sets.values()) if (μ := fs.membership(theta_dot_val)) > 0]
+        if perfil is not None:
+            perfil.marcar("fuzzificacion")
+
+        num = den = 0.0
+        for i, μ1 in activos_theta:
+            fila = self.tabla_reglas[i]
+            for j, μ2 in activos_theta_dot:
+                k = fila[j]
+                if k >= 0:
+                    c0, c1, c2 = self.coeficientes_sugeno[k]
+                    w = min(μ1, μ2)
+                    num += w * (c0 + c1 * theta_val + c2 * theta_dot_val)
+                    den += w
+
+        self.last_centroid = float(num / den) if den != 0 else 0
+        if perfil is not None:
+            perfil.marcar("reglas")
+            nombres_theta, nombres_theta_dot = list(self.theta_var.sets), list(self.theta_dot_var.sets)
+            perfil.registrar_reglas([(nombres_theta[i], nombres_theta_dot[j]) for i, _ in activos_theta
+                                     for j, _ in activos_theta_dot if self.tabla_reglas[i][j] >= 0])
+            perfil.marcar("defuzzificacion")
         return self.last_centroid
+
+    # Inferencia de muchos estados (θ, θ') a la vez. Devuelve un array de fuerzas con la forma de
+    # las entradas y, si se pide, la matriz de activación de cada regla (forma + (n_reglas,))
+    def infer_batch(self, theta_array, theta_dot_array, devolver_activaciones=False, tamano_bloque=2048):
+        if self.modo == "tabla":
+            # F siempre sale de la tabla; las activaciones, si se piden, se calculan aparte
+            fuerzas = self._interpolar_tabla_batch(theta_array, theta_dot_array)
+            if devolver_activaciones:
+                forma, activaciones, _ = self._activaciones_batch(theta_array, theta_dot_array)
+                return fuerzas, activaciones.reshape(forma + (len(self.rules),))
+            return fuerzas
+        if self.modo == "analitico":
+            return self._infer_batch_analitico(theta_array, theta_dot_array, devolver_activaciones, tamano_bloque)
+        if self.modo == "sugeno":
+            return self._infer_batch_sugeno(theta_array, theta_dot_array, devolver_activaciones)
+        return self._infer_batch_exacto(theta_array, theta_dot_array, devolver_activaciones, tamano_bloque)
+
+    def _interpolar_tabla_batch(self, theta_array, theta_dot_array):
+        theta, theta_dot = np.broadcast_arrays(np.asarray(theta_array, dtype=float),
+                                               np.asarray(theta_dot_array, dtype=float))
+        theta = np.where(theta > np.pi, theta - 2 * np.pi, np.where(theta < -np.pi, theta + 2 * np.pi, theta))
+        eje_theta, eje_theta_dot = self.ejes_tabla
+        u = (theta - eje_theta[0]) / (eje_theta[1] - eje_theta[0])
+        v = (theta_dot - eje_theta_dot[0]) / (eje_theta_dot[1] - eje_theta_dot[0])
+        i = np.clip(u.astype(int), 0, len(eje_theta) - 2)
+        j = np.clip(v.astype(int), 0, len(eje_theta_dot) - 2)
+        fu, fv = u - i, v - j
+        T = self.tabla
+        fuerzas = ((T[i, j] * (1 - fu) + T[i + 1, j] * fu) * (1 - fv) +
+                   (T[i, j + 1] * (1 - fu) + T[i + 1, j + 1] * fu) * fv)
+
+        # Los puntos fuera de la tabla se resuelven con la inferencia exacta
+        fuera = (theta < eje_theta[0]) | (theta > eje_theta[-1]) | (theta_dot < eje_theta_dot[0]) | (theta_dot > eje_theta_dot[-1])
+        if np.any(fuera):
+            fuerzas[fuera] = self._infer_batch_exacto(theta[fuera], theta_dot[fuera])
+        return fuerzas
+
+    def _infer_batch_sugeno(self, theta_array, theta_dot_array, devolver_activaciones=False):
+        theta, theta_dot = np.broadcast_arrays(np.asarray(theta_array, dtype=float),
+                                               np.asarray(theta_dot_array, dtype=float))
+        forma = theta.shape
+        theta, theta_dot = theta.ravel(), theta_dot.ravel()
+        theta = np.where(theta > np.pi, theta - 2 * np.pi, np.where(theta < -np.pi, theta + 2 * np.pi, theta))
+
+        a1, a2, cons = self.indices_reglas.T
+        activaciones = np.minimum(self.theta_var.fuzzify_array(theta)[a1], self.theta_dot_var.fuzzify_array(theta_dot)[a2]) # (reglas, N)
+        c0, c1, c2 = self.coeficientes_sugeno[cons].T
+        salidas = c0[:, None] + c1[:, None] * theta + c2[:, None] * theta_dot
+        num = (activaciones * salidas).sum(axis=0)
+        den = activaciones.sum(axis=0)
+        fuerzas = np.divide(num, den, out=np.zeros_like(num), where=den != 0).reshape(forma)
+        if devolver_activaciones:
+            return fuerzas, activaciones.T.reshape(forma + (len(self.rules),))
+        return fuerzas
+
+    # Forma de las entradas, activación de cada regla (N, reglas) y de cada conjunto de F (N, conjuntos)
+    def _activaciones_batch(self, theta_array, theta_dot_array):
+        theta, theta_dot = np.broadcast_arrays(np.asarray(theta_array, dtype=float),
+                                               np.asarray(theta_dot_array, dtype=float))
+        forma = theta.shape
+        theta, theta_dot = theta.ravel(), theta_dot.ravel()
+
+        # Misma circularidad que infer
+        theta = np.where(theta > np.pi, theta - 2 * np.pi, np.where(theta < -np.pi, theta + 2 * np.pi, theta))
+
+        μ_theta = self.theta_var.fuzzify_array(theta) # (conjuntos, N)
+        μ_theta_dot = self.theta_dot_var.fuzzify_array(theta_dot)
+
+        # Activación de cada regla con AND = mínimo: (N, reglas)
+        a1, a2, cons = self.indices_reglas.T
+        activaciones = np.minimum(μ_theta[a1], μ_theta_dot[a2]).T
+
+        # Las reglas con el mismo consecuente recortan la misma curva: alcanza con su máximo
+        act_consecuente = np.zeros((theta.size, len(self.force_var.sets)))
+        for k in range(act_consecuente.shape[1]):
+            if np.any(cons == k):
+                act_consecuente[:, k] = activaciones[:, cons == k].max(axis=1)
+        return forma, activaciones, act_consecuente
+
+    # Centroide analítico de cada estado, sin pasar por la cache ni por last_inputs / last_centroid
+    def _infer_batch_analitico(self, theta_array, theta_dot_array, devolver_activaciones=False, tamano_bloque=2048):
+        forma, activaciones, act_consecuente = self._activaciones_batch(theta_array, theta_dot_array)
+        fuerzas = np.zeros(len(act_consecuente))
+        for inicio in range(0, len(act_consecuente), tamano_bloque): # por bloques, como _infer_batch_exacto
+            fuerzas[inicio:inicio + tamano_bloque] = self._centroides_analiticos(act_consecuente[inicio:inicio + tamano_bloque])
+        fuerzas = fuerzas.reshape(forma)
+        if devolver_activaciones:
+            return fuerzas, activaciones.reshape(forma + (len(self.rules),))
+        return fuerzas
+
+    def _infer_batch_exacto(self, theta_array, theta_dot_array, devolver_activaciones=False, tamano_bloque=2048):
+        if not hasattr(self, "curvas_fuerza"):
+            self._precalcular_curvas()
+        forma, activaciones, act_consecuente = self._activaciones_batch(theta_array, theta_dot_array)
+        n_fuerza = len(self.curvas_fuerza)
+
+        # Agregación y centroide por bloques para no armar un array (N, puntos) enorme
+        fuerzas = np.zeros(len(act_consecuente))
+        for inicio in range(0, len(act_consecuente), tamano_bloque):
+            bloque = act_consecuente[inicio:inicio + tamano_bloque]
+            salida = np.zeros((len(bloque), len(self.x_fuerza)))
+            for k in range(n_fuerza):
+                np.maximum(salida, np.minimum(bloque[:, k, None], self.curvas_fuerza[k]), out=salida)
+            den = salida.sum(axis=1)
+            num = salida @ self.x_fuerza
+            fuerzas[inicio:inicio + tamano_bloque] = np.divide(num, den, out=np.zeros_like(num), where=den != 0)
+
+        fuerzas = fuerzas.reshape(forma)
+        if devolver_activaciones:
+            return fuerzas, activaciones.reshape(forma + (len(self.rules),))
+        return fuerzas
     
     
+    # Muestra la última inferencia en el InspectorInferencia del controlador (se reutiliza la misma
+    # figura mientras siga abierta)
     def graficar_resultado(self):
+        import matplotlib.pyplot as plt # solo hace falta al graficar
+        from visualizar import InspectorInferencia
+
+        if self.inspector is None or not self.inspector.abierto():
+            self.inspector = InspectorInferencia(self)
         theta_val, theta_dot_val = self.last_inputs
-        x_force = np.linspace(-30, 30, 1000)
-        x_theta = np.linspace(-np.pi, np.pi, 1000)
-        x_theta_dot = np.linspace(-10, 10, 1000)
-
-        fig, axs = plt.subplots(3, 1, figsize=(10, 12))
-
-        # theta
-        for label, fs in self.theta_var.sets.items():
-            axs[0].plot(x_theta, [fs.membership(x) for x in x_theta], linestyle='--', label=label)
-        axs[0].axvline(theta_val, color='red', linestyle='-', label=f'theta = {theta_val}')
-        axs[0].set_title("Funciones de pertenencia de θ (posición)")
-        axs[0].set_xlabel("θ (grados)")
-        axs[0].set_ylabel("μ")
-        axs[0].grid(True)
-        axs[0].legend()
-
-        # theta'
-        for label, fs in self.theta_dot_var.sets.items():
-            axs[1].plot(x_theta_dot, [fs.membership(x) for x in x_theta_dot], linestyle='--', label=label)
-        axs[1].axvline(theta_dot_val, color='red', linestyle='-', label=f"θ' = {theta_dot_val}")
-        axs[1].set_title("Funciones de pertenencia de θ' (velocidad angular)")
-        axs[1].set_xlabel("θ' (rad/s)")
-        axs[1].set_ylabel("μ")
-        axs[1].grid(True)
-        axs[1].legend()
-
-        # fuerza combinada
-        for label, fs in self.force_var.sets.items():
-            axs[2].plot(x_force, [fs.membership(x) for x in x_force], linestyle='--', label=f"{label} original")
-        y_combined = [self.last_output_memberships.get(x, 0) for x in x_force]
-        axs[2].plot(x_force, y_combined, color='black', linewidth=2.5, label="Salida combinada")
-        axs[2].axvline(self.last_centroid, color='red', linestyle='-', label=f"Centroide = {self.last_centroid:.2f}")
-        axs[2].set_title("Funciones de pertenencia de la fuerza y salida combinada")
-        axs[2].set_xlabel("Fuerza (N)")
-        axs[2].set_ylabel("μ")
-        axs[2].grid(True)
-        axs[2].legend()
-
-        plt.tight_layout()
-        plt.subplots_adjust(hspace=0.4)
+        self.inspector.mostrar(theta_val, theta_dot_val, self.last_centroid)
         plt.show()
 
-# Ejemplo de definición de variables y conjuntos
+# El controlador del TP, definido en especificaciones/pendulo_final.toml
 def crear_controlador():
-    theta_sets = [
-        FuzzySet("NG", -np.pi, -2.5, -2.5, -1.5),
-        FuzzySet("NP", -2, -1, 0),
-        FuzzySet("Z", -0.5, 0, 0.5),
-        FuzzySet("PP", 0, 1, 2),
-        FuzzySet("PG", 1.5, 2.5, 2.5, np.pi),
-    ]
-    theta_dot_sets = [
-        FuzzySet("NG", -10, -7.5, -7.5, -5),
-        FuzzySet("NP", -7, -4, -1),
-        FuzzySet("Z", -2, 0, 2),
-        FuzzySet("PP", 1, 4, 7),
-        FuzzySet("PG", 5, 7.5, 7.5, 10),
-    ]
-    force_sets = [
-        FuzzySet("NG", -30, -28, -28, -20),
-        FuzzySet("NP", -25, -15, -5),
-        FuzzySet("Z", -10, 0, 10),
-        FuzzySet("PP", 5, 15, 25),
-        FuzzySet("PG", 20, 28, 28, 30),
-    ]
-
-    # Cargar reglas
-    rules_data = [
-            ("NG", "NG", "NG"), ("NP", "NG", "NG"), ("Z", "NG", "NP"), ("PP", "NG", "NP"), ("PG", "NG", "Z"),
-            ("NG", "NP", "NG"), ("NP", "NP", "NP"), ("Z", "NP", "NP"), ("PP", "NP", "Z"), ("PG", "NP", "PP"),
-            ("NG", "Z", "NG"), ("NP", "Z", "NP"), ("Z", "Z", "Z"), ("PP", "Z", "PP"), ("PG", "Z", "PG"),
-            ("NG", "PP", "NP"), ("NP", "PP", "Z"), ("Z", "PP", "PP"), ("PP", "PP", "PP"), ("PG", "PP", "PG"),
-            ("NG", "PG", "Z"), ("NP", "PG", "PP"), ("Z", "PG", "PG"), ("PP", "PG", "PG"), ("PG", "PG", "PG"),
-    ]
-
-    rules = [FuzzyRule(a1, a2, c) for a1, a2, c in rules_data]
-
-    return FuzzyController(FuzzyVariable("theta", theta_sets), FuzzyVariable("theta_dot", theta_dot_sets), FuzzyVariable("force", force_sets), rules)
+    from especificacion import cargar_controlador # especificacion importa este módulo
+    return cargar_controlador("pendulo_final", modo="discreto")
+
+# Compara el centroide analítico contra el discretizado (grilla de n_puntos) en estados al azar
+def comparar_defuzzificacion(n_estados=500, n_puntos=1000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    theta = rng.uniform(-np.pi, np.pi, n_estados)
+    theta_dot = rng.uniform(-10, 10, n_estados)
+
+    discreto = crear_controlador().compilar(n_puntos).infer_batch(theta, theta_dot)
+    analitico = crear_controlador().compilar_analitico().infer_batch(theta, theta_dot)
+    error = np.abs(analitico - discreto)
+    return {"error_max": float(error.max()), "error_medio": float(error.mean())}
+
+# Compara Sugeno (singletons en los centroides, o los consecuentes dados) contra Mamdani en una
+# grilla que cubre todo el dominio de entrada, con el tiempo por estado de cada uno
+def comparar_sugeno(consecuentes=None, n_theta=201, n_theta_dot=201):
+    theta = np.linspace(-np.pi, np.pi, n_theta)[:, None]
+    theta_dot = np.linspace(-10, 10, n_theta_dot)[None, :]
+
+    inicio = time.perf_counter()
+    mamdani = crear_controlador().compilar().infer_batch(theta, theta_dot)
+    t_mamdani = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    sugeno = crear_controlador().compilar_sugeno(consecuentes).infer_batch(theta, theta_dot)
+    t_sugeno = time.perf_counter() - inicio
+
+    error = np.abs(sugeno - mamdani)
+    peor = np.unravel_index(np.argmax(error), error.shape)
+    return {
+        "error_max": float(error.max()),
+        "error_medio": float(error.mean()),
+        "error_rms": float(np.sqrt(np.mean(error ** 2))),
+        "peor_estado": (float(theta[peor[0], 0]), float(theta_dot[0, peor[1]])),
+        "us_por_estado_mamdani": t_mamdani / error.size * 1e6,
+        "us_por_estado_sugeno": t_sugeno / error.size * 1e6,
+    }
 '''
 #Ejemplo de uso
 theta_input =  np.radians(150)  # grados
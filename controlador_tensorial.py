@@ -0,0 +1,202 @@
+from itertools import product
+
+import numpy as np
+
+from controlador_pendulo_FINAL import FuzzySet, FuzzyVariable, crear_controlador
+
+# Motor de reglas con cualquier cantidad de entradas (θ, θ', x, ẋ, ...). La base de reglas se
+# guarda como un tensor de consecuentes con un eje por entrada: tensor[i, j, ...] es el índice del
+# conjunto de F de la regla (i, j, ...), -1 si no hay regla. Por cada entrada solo un par de
+# conjuntos tiene pertenencia > 0, así que se evalúan esas pocas celdas y no las 5^n reglas
+
+class FuzzyRuleN:
+    def __init__(self, antecedents, consequent):
+        self.antecedents = tuple(antecedents) # un conjunto por entrada, en el orden de las variables
+        self.consequent = consequent
+
+class ControladorTensorial:
+    # t_norma: "min" o "producto" para el AND de los antecedentes. denso=None elige la
+    # representación del tensor según cuántas celdas tienen regla. Las entradas de `saturadas` se
+    # recortan al dominio de sus conjuntos (fuera de él no dispararía ninguna regla)
+    def __init__(self, input_vars, force_var, rules, t_norma="min", denso=None, n_puntos=1000,
+                 circulares=("theta",), saturadas=(), rango_fuerza=(-30, 30)):
+        if t_norma not in ("min", "producto"):
+            raise ValueError(f"T-norma desconocida: {t_norma}")
+        self.input_vars = list(input_vars)
+        self.force_var = force_var
+        self.t_norma = t_norma
+        self.circulares = [var.name in circulares for var in self.input_vars]
+        self.limites = [(min(p for fs in var.sets.values() for p in fs.points), max(p for fs in var.sets.values() for p in fs.points))
+                        if var.name in saturadas else None for var in self.input_vars]
+        self.n_entradas = len(self.input_vars)
+        self.rango_fuerza = rango_fuerza
+        self.x_fuerza = np.linspace(*rango_fuerza, n_puntos)
+        self.curvas_fuerza = force_var.fuzzify_array(self.x_fuerza)
+        self.last_centroid = 0
+        self.last_inputs = (0,) * self.n_entradas
+        self._indexar_reglas(rules, denso)
+
+    def _indexar_reglas(self, rules, denso):
+        self.rules = rules
+        etiquetas = [list(var.sets) for var in self.input_vars]
+        force_labels = list(self.force_var.sets)
+        self.forma = tuple(len(e) for e in etiquetas)
+
+        consecuentes = {}
+        for r in rules:
+            if len(r.antecedents) != self.n_entradas:
+                raise ValueError(f"La regla {r.antecedents} no tiene {self.n_entradas} antecedentes")
+            celda = tuple(e.index(a) for e, a in zip(etiquetas, r.antecedents))
+            k = force_labels.index(r.consequent)
+            if consecuentes.setdefault(celda, k) != k:
+                raise ValueError(f"Reglas contradictorias para {r.antecedents}")
+
+        celdas = np.array(list(consecuentes), dtype=np.intp).reshape(-1, self.n_entradas)
+        planos = np.ravel_multi_index(celdas.T, self.forma) if len(celdas) else np.zeros(0, dtype=np.intp)
+        valores = np.array(list(consecuentes.values()), dtype=np.int8)
+
+        # Denso: array con una celda por combinación. Disperso: índices planos ordenados + consecuentes
+        self.denso = len(planos) * 4 >= np.prod(self.forma) if denso is None else denso
+        if self.denso:
+            self.tensor = np.full(self.forma, -1, dtype=np.int8)
+            self.tensor.ravel()[planos] = valores
+        else:
+            orden = np.argsort(planos)
+            self.planos_reglas = planos[orden]
+            self.valores_reglas = valores[orden]
+
+    # Consecuente de cada índice plano de celda (-1 si no hay regla)
+    def _consecuentes(self, planos):
+        if self.denso:
+            return self.tensor.ravel()[planos]
+        if len(self.planos_reglas) == 0:
+            return np.full(np.shape(planos), -1, dtype=np.int8)
+        pos = np.minimum(np.searchsorted(self.planos_reglas, planos), len(self.planos_reglas) - 1)
+        return np.where(self.planos_reglas[pos] == planos, self.valores_reglas[pos], -1)
+
+    # Circularidad de θ (igual que FuzzyController.infer) y saturación de las entradas que la piden
+    def _preparar(self, valores):
+        valores = [np.where(v > np.pi, v - 2 * np.pi, np.where(v < -np.pi, v + 2 * np.pi, v)) if c else v
+                   for v, c in zip(valores, self.circulares)]
+        return [np.clip(v, *lim) if lim is not None else v for v, lim in zip(valores, self.limites)]
+
+    # Agregación (max de las curvas recortadas) y centroide sobre el eje de F
+    def _centroide(self, act_consecuente):
+        salida = np.zeros(act_consecuente.shape[:-1] + self.x_fuerza.shape)
+        for k in range(len(self.curvas_fuerza)):
+            np.maximum(salida, np.minimum(act_consecuente[..., k, None], self.curvas_fuerza[k]), out=salida)
+        den = salida.sum(axis=-1)
+        num = salida @ self.x_fuerza
+        return np.divide(num, den, out=np.zeros_like(num), where=den != 0)
+
+    def infer(self, *valores):
+        valores = [float(v) for v in self._preparar(valores)]
+        self.last_inputs = tuple(valores)
+
+        activos = [[(i, μ) for i, fs in enumerate(var.sets.values()) if (μ := fs.membership(v)) > 0]
+                   for var, v in zip(self.input_vars, valores)]
+
+        activaciones = np.zeros(len(self.curvas_fuerza))
+        for combinacion in product(*activos): # solo las celdas con todas las pertenencias > 0
+            celda = tuple(i for i, _ in combinacion)
+            k = self._consecuentes(np.ravel_multi_index(celda, self.forma))
+            if k < 0:
+                continue
+            μs = [μ for _, μ in combinacion]
+            activacion = min(μs) if self.t_norma == "min" else float(np.prod(μs))
+            activaciones[k] = max(activaciones[k], activacion)
+
+        self.last_centroid = float(self._centroide(activaciones))
+        return self.last_centroid
+
+    # Inferencia de muchos estados a la vez: un array por entrada, todos de la misma forma
+    def infer_batch(self, *arrays, tamano_bloque=2048):
+        arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in arrays))
+        forma = arrays[0].shape
+        valores = self._preparar([a.ravel() for a in arrays])
+        n = valores[0].size
+
+        # Por entrada, los k conjuntos de mayor pertenencia (k = máximo de conjuntos activos a la vez)
+        indices, pertenencias = [], []
+        for var, v in zip(self.input_vars, valores):
+            μ = var.fuzzify_array(v).T # (N, conjuntos)
+            k = max(int((μ > 0).sum(axis=1).max(initial=0)), 1)
+            top = np.argpartition(-μ, k - 1, axis=1)[:, :k] if k < μ.shape[1] else np.broadcast_to(np.arange(μ.shape[1]), μ.shape)
+            indices.append(top)
+            pertenencias.append(np.take_along_axis(μ, top, axis=1))
+
+        # Celdas candidatas por estado: producto cartesiano de los activos de cada entrada, (N, celdas)
+        d = self.n_entradas
+        ejes = [idx.reshape((n,) + tuple(-1 if e == i else 1 for e in range(d))) for i, idx in enumerate(indices)]
+        ejes_μ = [μ.reshape((n,) + tuple(-1 if e == i else 1 for e in range(d))) for i, μ in enumerate(pertenencias)]
+        celdas = np.broadcast_arrays(*ejes)
+        planos = np.ravel_multi_index(celdas, self.forma).reshape(n, -1)
+        reduccion = np.minimum if self.t_norma == "min" else np.multiply
+        activacion = ejes_μ[0]
+        for μ in ejes_μ[1:]:
+            activacion = reduccion(activacion, μ)
+        activacion = np.broadcast_to(activacion, celdas[0].shape).reshape(n, -1)
+
+        cons = self._consecuentes(planos)
+        act_consecuente = np.zeros((n, len(self.curvas_fuerza)))
+        for k in range(len(self.curvas_fuerza)):
+            act_consecuente[:, k] = np.where(cons == k, activacion, 0).max(axis=1, initial=0)
+
+        fuerzas = np.zeros(n)
+        for inicio in range(0, n, tamano_bloque):
+            fuerzas[inicio:inicio + tamano_bloque] = self._centroide(act_consecuente[inicio:inicio + tamano_bloque])
+        return fuerzas.reshape(forma)
+
+# El controlador de dos entradas de crear_controlador() como tensor 5×5
+def desde_controlador(controller, **kwargs):
+    rules = [FuzzyRuleN((r.antecedent1, r.antecedent2), r.consequent) for r in controller.rules]
+    return ControladorTensorial([controller.theta_var, controller.theta_dot_var], controller.force_var, rules, **kwargs)
+
+# Controlador de cuatro entradas (5^4 = 625 reglas): las reglas de θ y θ' de crear_controlador()
+# más una corrección para que el carro no se escape. Para volver al centro el carro primero tiene
+# que inclinar el péndulo hacia el centro, así que si el carro se aleja hacia la derecha se empuja
+# un poco más a la derecha (mismo signo que en un LQR). Un conjunto de F de diferencia es mucha
+# fuerza, así que la corrección solo se aplica con el péndulo quieto arriba (θ y θ' en Z) y el
+# carro lejos y alejándose (x y ẋ los dos en NG o los dos en PG)
+def crear_controlador_4d(**kwargs):
+    base = crear_controlador()
+    x_sets = [
+        FuzzySet("NG", -2.4, -1.5, -1.5, -0.5),
+        FuzzySet("NP", -1.5, -0.5, 0),
+        FuzzySet("Z", -0.5, 0, 0.5),
+        FuzzySet("PP", 0, 0.5, 1.5),
+        FuzzySet("PG", 0.5, 1.5, 1.5, 2.4),
+    ]
+    x_dot_sets = [
+        FuzzySet("NG", -3, -2, -2, -1),
+        FuzzySet("NP", -2, -1, 0),
+        FuzzySet("Z", -0.5, 0, 0.5),
+        FuzzySet("PP", 0, 1, 2),
+        FuzzySet("PG", 1, 2, 2, 3),
+    ]
+    etiquetas = list(base.force_var.sets)
+    correccion = {("NG", "NG"): -1, ("PG", "PG"): 1}
+
+    rules = []
+    for r in base.rules:
+        k = etiquetas.index(r.consequent)
+        for cx, cx_dot in product([fs.name for fs in x_sets], [fs.name for fs in x_dot_sets]):
+            k_nuevo = k
+            if r.antecedent1 == r.antecedent2 == "Z":
+                k_nuevo = min(max(k + correccion.get((cx, cx_dot), 0), 0), len(etiquetas) - 1)
+            rules.append(FuzzyRuleN((r.antecedent1, r.antecedent2, cx, cx_dot), etiquetas[k_nuevo]))
+
+    return ControladorTensorial([base.theta_var, base.theta_dot_var, FuzzyVariable("x", x_sets),
+                                 FuzzyVariable("x_dot", x_dot_sets)], base.force_var, rules,
+                                saturadas=("x", "x_dot"), **kwargs)
+
+
+if __name__ == "__main__":
+    from simulacion import simular_lote_carro
+
+    # Mismas condiciones iniciales con el controlador de θ, θ' y con el de cuatro entradas
+    theta_0 = [-30, -10, 10, 30]
+    for nombre, controller in (("θ, θ'", crear_controlador().compilar()), ("θ, θ', x, ẋ", crear_controlador_4d())):
+        x, y_theta, _, y_x, _, _ = simular_lote_carro(controller, 30, 0.01, theta_0, 0)
+        print(f"{nombre}: |θ| final máx = {np.abs(y_theta[:, -500:]).max(axis=1).round(1)}, "
+              f"|x| final máx = {np.abs(y_x[:, -500:]).max(axis=1).round(2)}")
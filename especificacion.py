@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+try:
+    import tomllib
+except ModuleNotFoundError: # Python < 3.11: mismo módulo instalado aparte
+    try:
+        import tomli as tomllib
+    except ModuleNotFoundError:
+        tomllib = None
+
+from controlador_pendulo_FINAL import FuzzyController, FuzzyRule, FuzzySet, FuzzyVariable
+
+# Controladores definidos en archivos TOML o JSON (ver especificaciones/) en lugar de literales de
+# Python. Lo que se precalcula al compilar se guarda en CARPETA_CACHE con el hash del contenido de
+# la especificación y del modo como nombre, así otra corrida o un proceso de un pool lo lee de disco.
+# La carpeta se cambia con la variable de entorno CACHE_CONTROLADORES (por ejemplo si el código está
+# en un lugar de solo lectura); si no se puede escribir, se compila igual y no se guarda
+
+CARPETA_ESPECIFICACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "especificaciones")
+CARPETA_CACHE = os.environ.get("CACHE_CONTROLADORES",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_controladores"))
+VERSION_CACHE = 2 # cambiarla si cambia cómo se compila, para no leer caches viejas
+
+VARIABLES = ("theta", "theta_dot", "force")
+
+# Atributos que dejan compilar / compilar_analitico / compilar_tabla / compilar_sugeno. Los índices
+# de las reglas no se guardan: FuzzyController los arma al crearse y es mucho más barato que leerlos
+ATRIBUTOS_COMPILADOS = ("x_fuerza", "curvas_fuerza", "segmentos_fuerza", "quiebres_fuerza", "pendientes_fuerza",
+                        "ordenadas_fuerza", "cortes_fuerza", "tabla", "coeficientes_sugeno")
+
+def ruta_especificacion(nombre):
+    return os.path.join(CARPETA_ESPECIFICACIONES, nombre + ".toml")
+
+def cargar_especificacion(ruta):
+    if ruta.endswith(".json"):
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    if tomllib is None:
+        raise ModuleNotFoundError(f"Para leer {ruta} en Python < 3.11 hace falta tomli (pip install tomli)")
+    with open(ruta, "rb") as f:
+        return tomllib.load(f)
+
+def controlador_desde_especificacion(spec):
+    variables = []
+    for nombre in VARIABLES:
+        if nombre not in spec.get("variables", {}):
+            raise ValueError(f"La especificación no define la variable {nombre}")
+        definicion = spec["variables"][nombre]
+        escala = np.pi / 180 if definicion.get("unidad") == "grados" else 1 # el motor trabaja en radianes
+        sets = []
+        for label, puntos in definicion["conjuntos"].items():
+            if len(puntos) not in (3, 4):
+                raise ValueError(f"El conjunto {nombre}.{label} tiene {len(puntos)} puntos (tienen que ser 3 o 4)")
+            sets.append(FuzzySet(label, *(p * escala if escala != 1 else p for p in puntos)))
+        variables.append(FuzzyVariable(nombre, sets))
+
+    # Tabla de reglas: una fila por conjunto de θ' con el consecuente para cada conjunto de θ
+    tabla = spec["reglas"]
+    columnas = tabla["columnas"]
+    rules = []
+    for fila, consecuentes in tabla.items():
+        if fila == "columnas":
+            continue
+        if len(consecuentes) != len(columnas):
+            raise ValueError(f"La fila {fila} de la tabla de reglas no tiene {len(columnas)} consecuentes")
+        rules += [FuzzyRule(a1, fila, c) for a1, c in zip(columnas, consecuentes) if c]
+    return FuzzyController(*variables, rules)
+
+# Compila el controlador en `modo` con los parámetros dados
+def _compilar(controller, modo, parametros):
+    if modo == "compilado":
+        return controller.compilar(**parametros)
+    if modo == "analitico":
+        return controller.compilar_analitico(**parametros)
+    if modo == "tabla":
+        return controller.compilar_tabla(**parametros)
+    if modo == "sugeno":
+        return controller.compilar_sugeno(**parametros)
+    if modo == "discreto":
+        return controller
+    raise ValueError(f"Modo desconocido: {modo}")
+
+def hash_contenido(spec, modo, parametros):
+    contenido = json.dumps({"spec": spec, "modo": modo, "parametros": parametros, "version": VERSION_CACHE},
+                           sort_keys=True, default=float)
+    return hashlib.sha256(contenido.encode()).hexdigest()[:32]
+
+# Carga un controlador por nombre de especificación (o ruta a un .toml / .json) compilado en `modo`.
+# Si la cache tiene el resultado de esa misma especificación y parámetros se usa directamente
+def cargar_controlador(especificacion="pendulo_final", modo="compilado", cache=True, **parametros):
+    ruta = especificacion if os.path.splitext(especificacion)[1] else ruta_especificacion(especificacion)
+    spec = cargar_especificacion(ruta)
+    controller = controlador_desde_especificacion(spec)
+    if modo == "discreto" or not cache:
+        return _compilar(controller, modo, parametros)
+
+    archivo = os.path.join(CARPETA_CACHE, hash_contenido(spec, modo, parametros) + ".npz")
+    if os.path.exists(archivo):
+        with np.load(archivo) as f:
+            datos = {nombre: f[nombre] for nombre in f.files}
+        if "ejes_theta" in datos:
+            controller.ejes_tabla = (datos.pop("ejes_theta"), datos.pop("ejes_theta_dot"))
+            controller.error_tabla = {"error_max": float(datos.pop("error_tabla_max")),
+                                      "error_medio": float(datos.pop("error_tabla_medio"))}
+        for nombre, valor in datos.items():
+            setattr(controller, nombre, valor)
+        controller.modo = modo
+        return controller
+
+    _compilar(controller, modo, parametros)
+    datos = {nombre: getattr(controller, nombre) for nombre in ATRIBUTOS_COMPILADOS if hasattr(controller, nombre)}
+    if modo == "tabla":
+        datos.update(ejes_theta=controller.ejes_tabla[0], ejes_theta_dot=controller.ejes_tabla[1],
+                     error_tabla_max=controller.error_tabla["error_max"], error_tabla_medio=controller.error_tabla["error_medio"])
+
+    # Se escribe a un temporal y se renombra: otro proceso nunca ve un archivo a medio escribir
+    temporal = f"{archivo}.{os.getpid()}.tmp.npz"
+    try:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        np.savez(temporal, **datos)
+        os.replace(temporal, archivo)
+    except OSError: # carpeta de solo lectura: se sigue sin cache
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return controller
+
+def limpiar_cache():
+    if os.path.isdir(CARPETA_CACHE):
+        for nombre in os.listdir(CARPETA_CACHE):
+            os.remove(os.path.join(CARPETA_CACHE, nombre))
@@ -0,0 +1,105 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Sin pantalla: en los procesos del pool pygame dibuja sobre superficies en memoria con el driver
+# "dummy" de SDL. Solo ahí, para que una ventana de pygame del proceso principal se siga viendo
+def _iniciar_proceso():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+# Dibuja un bloque de cuadros de una corrida (solo las muestras de esos cuadros; inicio es el número
+# del primero) y los guarda como PNG sueltos o como un trozo de video crudo RGB24. Corre en un
+# proceso del pool
+def _renderizar_bloque(tarea):
+    import pygame
+    import animacion_carrito
+
+    carpeta, formato, y_theta, y_fuerza, tiempos, posiciones, L, tamano, inicio = tarea
+    pygame.init()
+    fuente = animacion_carrito.obtener_fuente()
+    superficie = pygame.Surface((animacion_carrito.ANCHO_VENTANA, animacion_carrito.ALTO_VENTANA))
+
+    crudo = open(os.path.join(carpeta, f"parte_{inicio:06d}.rgb"), "wb") if formato == "raw" else None
+    try:
+        for n, muestra in enumerate(zip(posiciones, y_theta, y_fuerza, tiempos), start=inicio):
+            animacion_carrito.dibujar_cuadro(superficie, fuente, *muestra, L)
+            cuadro = pygame.transform.smoothscale(superficie, tamano) if tamano else superficie
+            if crudo:
+                crudo.write(pygame.image.tobytes(cuadro, "RGB"))
+            else:
+                pygame.image.save(cuadro, os.path.join(carpeta, f"cuadro_{n:06d}.png"))
+    finally:
+        if crudo:
+            crudo.close()
+        animacion_carrito.cerrar_ventana()
+
+# Exporta varias corridas [(y_theta, y_fuerza, tiempos), ...] a carpeta/corrida_XXX, repartiendo
+# los cuadros de todas en bloques entre procesos. formato="png" deja una secuencia de imágenes;
+# formato="raw" deja video.rgb (RGB24 crudo) y video.json con tamaño y fps, que se convierte con:
+#   ffmpeg -f rawvideo -pix_fmt rgb24 -s ANCHOxALTO -r FPS -i video.rgb video.mp4
+# fps=None pone un cuadro por muestra; con fps dado se toman las muestras que corresponden a
+# tiempo real. tamano=(ancho, alto) reescala los cuadros
+def exportar_lote(corridas, carpeta, formato="png", fps=None, tamano=None, L=0.5, dt=0.01, m_carrito=1,
+                  procesos=None, cuadros_por_bloque=200):
+    import animacion_carrito
+
+    if formato not in ("png", "raw"):
+        raise ValueError(f"Formato desconocido: {formato}")
+    procesos = procesos or os.cpu_count()
+
+    tareas, salidas = [], []
+    for c, (y_theta, y_fuerza, tiempos) in enumerate(corridas):
+        y_theta, y_fuerza, tiempos = np.asarray(y_theta), np.asarray(y_fuerza), np.asarray(tiempos)
+        destino = os.path.join(carpeta, f"corrida_{c:03d}")
+        os.makedirs(destino, exist_ok=True)
+
+        posiciones = animacion_carrito.posiciones_carrito(y_fuerza, dt, m_carrito)
+        if fps:
+            cuadros = np.arange(tiempos[0], tiempos[-1] + 1e-9, 1 / fps)
+            indices = np.minimum(np.searchsorted(tiempos, cuadros), len(tiempos) - 1)
+        else:
+            indices = np.arange(len(tiempos))
+
+        partes = []
+        for inicio in range(0, len(indices), cuadros_por_bloque):
+            bloque = indices[inicio:inicio + cuadros_por_bloque]
+            # Cada tarea lleva solo sus muestras: mandar las trayectorias enteras a cada bloque
+            # haría crecer lo que se copia entre procesos con bloques × largo de la corrida
+            tareas.append((destino, formato, y_theta[bloque], y_fuerza[bloque], tiempos[bloque], posiciones[bloque],
+                           L, tamano, inicio))
+            partes.append(os.path.join(destino, f"parte_{inicio:06d}.rgb"))
+        salidas.append((destino, partes, fps or 1 / dt))
+
+    with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso) as pool:
+        for _ in pool.map(_renderizar_bloque, tareas):
+            pass
+
+    # Los trozos de video crudo se concatenan en orden
+    if formato == "raw":
+        ancho, alto = tamano or (animacion_carrito.ANCHO_VENTANA, animacion_carrito.ALTO_VENTANA)
+        for destino, partes, fps_video in salidas:
+            with open(os.path.join(destino, "video.rgb"), "wb") as video:
+                for parte in partes:
+                    with open(parte, "rb") as f:
+                        while datos := f.read(1 << 24):
+                            video.write(datos)
+                    os.remove(parte)
+            with open(os.path.join(destino, "video.json"), "w", encoding="utf-8") as f:
+                json.dump({"ancho": ancho, "alto": alto, "fps": fps_video, "pix_fmt": "rgb24"}, f)
+    return [destino for destino, _, _ in salidas]
+
+def exportar(y_theta, y_fuerza, tiempos, carpeta, **kwargs):
+    return exportar_lote([(y_theta, y_fuerza, tiempos)], carpeta, **kwargs)[0]
+
+
+if __name__ == "__main__":
+    from controlador_pendulo_FINAL import crear_controlador
+    from simulacion import simular_lote
+
+    theta_0 = np.array([-90, -45, 45, 90])
+    x, y_theta, _, y_fuerza = simular_lote(crear_controlador().compilar(), 5, 0.01, theta_0, 0)
+    carpetas = exportar_lote([(y_theta[i], y_fuerza[i], x) for i in range(len(theta_0))], "exportado",
+                             formato="raw", fps=50, tamano=(960, 540))
+    print("Exportado en:", ", ".join(carpetas))
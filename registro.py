@@ -0,0 +1,155 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Formato del registro de trayectorias (solo se agrega al final):
+#   MAGICO (8 bytes) | largo del encabezado (uint32) | encabezado JSON con columnas y metadatos,
+#   rellenado hasta múltiplo de 64 bytes | filas float32 de len(columnas) valores cada una
+# Las filas se escriben por bloques de `filas_por_bloque`; para leer se mapea el archivo en memoria
+# con np.memmap, así cada columna es una vista que se carga del disco solo cuando se usa
+MAGICO = b"TRAYLOG1"
+ALINEACION = 64
+COLUMNAS = ("t", "theta", "theta_dot", "F")
+
+def _leer_encabezado(f):
+    if f.read(len(MAGICO)) != MAGICO:
+        raise ValueError("No es un registro de trayectorias")
+    largo, = struct.unpack("<I", f.read(4))
+    encabezado = json.loads(f.read(largo).decode("utf-8"))
+    return encabezado, len(MAGICO) + 4 + largo
+
+class RegistroTrayectoria:
+    # Un archivo existente se reescribe salvo con anexar=True: ahí se sigue agregando al final, y
+    # tiene que tener las mismas columnas y metadatos (el encabezado es uno solo para todo el archivo)
+    def __init__(self, ruta, columnas=COLUMNAS, metadatos=None, filas_por_bloque=4096, anexar=False):
+        self.ruta = ruta
+        self.columnas = list(columnas)
+        metadatos = json.loads(json.dumps(metadatos or {})) # como quedan al leerlos (tuplas -> listas)
+        if anexar and os.path.exists(ruta) and os.path.getsize(ruta) > 0:
+            with open(ruta, "rb") as f:
+                encabezado, _ = _leer_encabezado(f)
+            if encabezado["columnas"] != self.columnas:
+                raise ValueError(f"El registro {ruta} tiene columnas {encabezado['columnas']}")
+            if encabezado["metadatos"] != metadatos:
+                raise ValueError(f"El registro {ruta} tiene metadatos {encabezado['metadatos']}, no {metadatos}")
+            self.archivo = open(ruta, "ab")
+            self._descartar_fila_incompleta()
+        else:
+            encabezado = json.dumps({"columnas": self.columnas, "dtype": "float32",
+                                     "metadatos": metadatos}, ensure_ascii=False).encode("utf-8")
+            relleno = -(len(MAGICO) + 4 + len(encabezado)) % ALINEACION
+            encabezado += b" " * relleno
+            self.archivo = open(ruta, "wb")
+            self.archivo.write(MAGICO + struct.pack("<I", len(encabezado)) + encabezado)
+        self.bloque = np.empty((filas_por_bloque, len(self.columnas)), dtype=np.float32)
+        self.n_bloque = 0
+
+    # Si una escritura anterior se cortó a mitad de fila, se recorta para no desalinear las siguientes
+    def _descartar_fila_incompleta(self):
+        with open(self.ruta, "rb") as f:
+            _, inicio = _leer_encabezado(f)
+        sobrante = (os.path.getsize(self.ruta) - inicio) % (4 * len(self.columnas))
+        if sobrante:
+            self.archivo.truncate(os.path.getsize(self.ruta) - sobrante)
+
+    def agregar(self, fila):
+        self.bloque[self.n_bloque] = fila
+        self.n_bloque += 1
+        if self.n_bloque == len(self.bloque):
+            self.volcar()
+
+    # Agrega muchas filas de una vez (array (n, columnas))
+    def agregar_filas(self, filas):
+        self.volcar()
+        np.ascontiguousarray(filas, dtype=np.float32).tofile(self.archivo)
+
+    def volcar(self):
+        if self.n_bloque:
+            self.bloque[:self.n_bloque].tofile(self.archivo)
+            self.n_bloque = 0
+        self.archivo.flush()
+
+    def cerrar(self):
+        self.volcar()
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+# Abre un registro sin cargarlo: devuelve {columna: vista memmap} y los metadatos
+def leer_registro(ruta):
+    with open(ruta, "rb") as f:
+        encabezado, inicio = _leer_encabezado(f)
+    columnas = encabezado["columnas"]
+    filas = (os.path.getsize(ruta) - inicio) // (4 * len(columnas))
+    if filas == 0:
+        return {c: np.empty(0, dtype=np.float32) for c in columnas}, encabezado["metadatos"]
+    datos = np.memmap(ruta, dtype=np.float32, mode="r", offset=inicio, shape=(filas, len(columnas)))
+    return {c: datos[:, j] for j, c in enumerate(columnas)}, encabezado["metadatos"]
+
+# Simula con simular_stream y va guardando cada paso en el registro (memoria constante)
+def registrar_simulacion(controller, ruta, t_max, delta_t, theta_0, v_0, activaciones=False, anexar=False, **kwargs):
+    from simulacion import simular_stream
+
+    columnas = list(COLUMNAS)
+    if activaciones:
+        columnas += [f"act_{r.antecedent1}_{r.antecedent2}" for r in controller.rules]
+    metadatos = {"theta_0": theta_0, "v_0": v_0, "delta_t": delta_t, "t_max": t_max}
+    with RegistroTrayectoria(ruta, columnas, metadatos, anexar=anexar) as registro:
+        for muestra in simular_stream(controller, delta_t, theta_0, v_0, t_max, activaciones=activaciones, **kwargs):
+            if activaciones:
+                *valores, activacion_reglas = muestra
+                registro.agregar(np.concatenate([valores, activacion_reglas]))
+            else:
+                registro.agregar(muestra)
+
+# Guarda las trayectorias de simular_lote (arrays (N, pasos)) con una columna "corrida"
+def registrar_lote(ruta, tiempos, y_theta, y_theta_dot, y_fuerza, metadatos=None, anexar=False):
+    with RegistroTrayectoria(ruta, ("corrida",) + COLUMNAS, metadatos, anexar=anexar) as registro:
+        for corrida in range(len(y_theta)):
+            registro.agregar_filas(np.column_stack([np.full(len(tiempos), corrida), tiempos, y_theta[corrida],
+                                                    y_theta_dot[corrida], y_fuerza[corrida]]))
+
+def _columnas_corrida(ruta, corrida):
+    columnas, _ = leer_registro(ruta)
+    if corrida is None:
+        return columnas
+    seleccion = np.flatnonzero(columnas["corrida"] == corrida)
+    inicio, fin = seleccion[0], seleccion[-1] + 1 # las filas de una corrida están juntas
+    return {c: v[inicio:fin] for c, v in columnas.items()}
+
+# Reproduce un registro guardado con los gráficos de ProgramaPrincipal_FINAL, sin volver a simular
+def reproducir_graficos(ruta, corrida=None):
+    from ProgramaPrincipal_FINAL import graficar_simulacion
+
+    c = _columnas_corrida(ruta, corrida)
+    graficar_simulacion(c["t"], c["theta"], c["theta_dot"], c["F"])
+
+# Reproduce un registro en la animación de pygame leyendo las filas a medida que se muestran
+def reproducir_animacion(ruta, corrida=None, **kwargs):
+    import animacion_carrito
+
+    c = _columnas_corrida(ruta, corrida)
+    dt = float(c["t"][1] - c["t"][0]) if len(c["t"]) > 1 else 0.01
+    muestras = ((float(t), float(theta), float(f)) for t, theta, f in zip(c["t"], c["theta"], c["F"]))
+    animacion_carrito.visualizar_stream(muestras, dt=dt, **kwargs)
+
+# Recorre paso a paso la inferencia de un registro (θ, θ' y la F aplicada) en el InspectorInferencia
+def inspeccionar_registro(ruta, corrida=None, controller=None):
+    import matplotlib.pyplot as plt
+    from controlador_pendulo_FINAL import crear_controlador
+    from visualizar import InspectorInferencia
+
+    c = _columnas_corrida(ruta, corrida)
+    _, metadatos = leer_registro(ruta)
+    # Los registros de registrar_simulacion guardan el estado inicial en los metadatos
+    inicial = (metadatos["theta_0"], metadatos["v_0"]) if corrida is None and "theta_0" in metadatos else None
+    inspector = InspectorInferencia(controller or crear_controlador())
+    inspector.cargar_trayectoria(c["theta"], c["theta_dot"], c["F"], c["t"], inicial)
+    plt.show()
+    return inspector
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import logging
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from controlador_pendulo_FINAL import crear_controlador
+from simulacion import calcula_aceleracion, normalizar_angulo
+
+# Protocolo binario (little endian), sin esperar respuesta para mandar el siguiente pedido:
+#   pedido:    id (uint32), θ (float64), θ' (float64)
+#   respuesta: id (uint32), F (float64)
+# Las respuestas de una conexión pueden llegar en otro orden que los pedidos; se asocian por id
+PEDIDO = struct.Struct("<Idd")
+RESPUESTA = struct.Struct("<Id")
+
+log = logging.getLogger(__name__)
+
+def percentiles(latencias):
+    if not latencias:
+        return {"p50_us": float("nan"), "p99_us": float("nan"), "muestras": 0}
+    p50, p99 = np.percentile(np.asarray(latencias) * 1e6, [50, 99])
+    return {"p50_us": float(p50), "p99_us": float(p99), "muestras": len(latencias)}
+
+# Servidor del controlador difuso. Los pedidos de todas las conexiones entran a una cola; un único
+# consumidor junta los que llegan juntos (hasta max_lote, esperando a lo sumo espera_max segundos
+# después del primero) y los resuelve con una sola llamada a infer_batch
+class ServidorControlador:
+    def __init__(self, controller=None, max_lote=256, espera_max=50e-6, historial=100_000):
+        self.controller = controller or crear_controlador().compilar()
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.latencias = deque(maxlen=historial) # desde que llega el pedido hasta que sale la respuesta
+        self.lotes = deque(maxlen=historial)
+        self.pendientes = asyncio.Queue()
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765, unix=None):
+        self._consumidor = asyncio.create_task(self._resolver_lotes())
+        if unix:
+            self.servidor = await asyncio.start_unix_server(self._atender, path=unix)
+        else:
+            self.servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self.servidor
+
+    async def cerrar(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        self._consumidor.cancel()
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                datos = await reader.readexactly(PEDIDO.size)
+                self.pendientes.put_nowait((time.perf_counter(), writer, *PEDIDO.unpack(datos)))
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            writer.close()
+
+    async def _resolver_lotes(self):
+        while True:
+            lote = [await self.pendientes.get()]
+            limite = time.perf_counter() + self.espera_max
+            while len(lote) < self.max_lote:
+                if self.pendientes.empty():
+                    if time.perf_counter() >= limite:
+                        break
+                    await asyncio.sleep(0) # deja que las conexiones lean lo que ya llegó
+                    continue
+                lote.append(self.pendientes.get_nowait())
+
+            try:
+                await self._responder(lote)
+            except Exception:
+                # El consumidor es uno solo: si se cae, todas las plantas quedan esperando en
+                # readexactly. Se cierran las conexiones de este lote y se sigue con el próximo
+                log.exception("Error resolviendo un lote de %d pedidos", len(lote))
+                for writer in {p[1] for p in lote}:
+                    writer.close()
+
+    async def _responder(self, lote):
+        if len(lote) == 1:
+            fuerzas = [self.controller.infer(lote[0][3], lote[0][4])]
+        else:
+            fuerzas = self.controller.infer_batch([p[3] for p in lote], [p[4] for p in lote])
+
+        escritores = set()
+        for (llegada, writer, id_pedido, _, _), fuerza in zip(lote, fuerzas):
+            if not writer.is_closing():
+                writer.write(RESPUESTA.pack(id_pedido, fuerza))
+                escritores.add(writer)
+        ahora = time.perf_counter()
+        self.latencias.extend(ahora - p[0] for p in lote)
+        self.lotes.append(len(lote))
+        for writer in escritores:
+            try:
+                await writer.drain()
+            except ConnectionError: # esa planta se desconectó; las demás siguen
+                writer.close()
+
+    def estadisticas(self):
+        datos = percentiles(list(self.latencias))
+        datos["lote_medio"] = float(np.mean(self.lotes)) if self.lotes else 0.0
+        return datos
+
+# Planta de prueba: simula `plantas` carros-péndulo independientes (calcula_aceleracion) que le
+# piden F al servicio en cada paso por una misma conexión, mandando todos los pedidos del paso de
+# una vez. Devuelve las trayectorias de θ (grados) y las latencias de ida y vuelta medidas acá
+async def planta_cliente(t_max=5, delta_t=0.01, theta_0=-90, v_0=0, plantas=1, host="127.0.0.1", puerto=8765, unix=None):
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, puerto)
+
+    theta = np.radians(np.broadcast_to(np.asarray(theta_0, dtype=float), (plantas,))).copy()
+    v = np.broadcast_to(np.asarray(v_0, dtype=float), (plantas,)).copy()
+    pasos = len(np.arange(0, t_max, delta_t))
+    y_theta = np.empty((plantas, pasos))
+    latencias = []
+
+    for paso in range(pasos):
+        envio = time.perf_counter()
+        writer.write(b"".join(PEDIDO.pack(i, theta[i], v[i]) for i in range(plantas)))
+        await writer.drain()
+
+        fuerzas = np.empty(plantas)
+        for _ in range(plantas):
+            id_pedido, fuerza = RESPUESTA.unpack(await reader.readexactly(RESPUESTA.size))
+            fuerzas[id_pedido] = fuerza
+            latencias.append(time.perf_counter() - envio)
+
+        for i in range(plantas):
+            a = calcula_aceleracion(theta[i], v[i], fuerzas[i])
+            theta[i] = normalizar_angulo(theta[i] + v[i] * delta_t + a * (delta_t ** 2) / 2)
+            v[i] = v[i] + a * delta_t
+        y_theta[:, paso] = np.degrees(theta)
+
+    writer.close()
+    await writer.wait_closed()
+    return y_theta, percentiles(latencias)
+
+# Prueba de lazo cerrado completa en localhost: levanta el servicio y corre la planta contra él
+async def prueba_local(plantas=1, t_max=5, **kwargs):
+    servidor = ServidorControlador()
+    await servidor.iniciar(puerto=0, **kwargs)
+    puerto = servidor.servidor.sockets[0].getsockname()[1] if not kwargs.get("unix") else None
+    y_theta, latencia_cliente = await planta_cliente(t_max=t_max, plantas=plantas, puerto=puerto, **kwargs)
+    await servidor.cerrar()
+    return y_theta, latencia_cliente, servidor.estadisticas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local del controlador difuso")
+    parser.add_argument("modo", choices=("servidor", "planta", "prueba"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--unix", help="ruta de un socket Unix en lugar de TCP")
+    parser.add_argument("--plantas", type=int, default=1)
+    parser.add_argument("--t-max", type=float, default=5)
+    args = parser.parse_args()
+
+    async def servir():
+        servidor = ServidorControlador()
+        await servidor.iniciar(args.host, args.puerto, args.unix)
+        print("Escuchando en", args.unix or f"{args.host}:{args.puerto}")
+        while True:
+            await asyncio.sleep(5)
+            print("Latencia del servicio:", servidor.estadisticas())
+
+    if args.modo == "servidor":
+        asyncio.run(servir())
+    elif args.modo == "planta":
+        _, latencia = asyncio.run(planta_cliente(args.t_max, plantas=args.plantas, host=args.host,
+                                                 puerto=args.puerto, unix=args.unix))
+        print("Latencia de ida y vuelta:", latencia)
+    else:
+        _, latencia, servicio = asyncio.run(prueba_local(args.plantas, args.t_max, unix=args.unix))
+        print("Latencia de ida y vuelta:", latencia)
+        print("Latencia del servicio:", servicio)
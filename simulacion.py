@@ -0,0 +1,283 @@
+import numpy as np
+
+G = 9.80665 # aceleración de la gravedad (scipy.constants.g), sin importar scipy
+
+# Constantes físicas
+CONSTANTE_M = 1 # Masa del carro
+CONSTANTE_m = 0.1 # Masa de la pertiga
+CONSTANTE_l = 0.5 # Longitud dela pertiga
+
+# Función para normalizar el ángulo al rango [-π, π] (sirve igual para arrays)
+def normalizar_angulo(angulo):
+    return (angulo + np.pi) % (2 * np.pi) - np.pi
+
+# Cálculo de aceleración angular θ'' con fuerza f
+def calcula_aceleracion(theta, v, f, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l):
+    sin_theta = np.sin(theta)
+    cos_theta = np.cos(theta)
+    num = G * sin_theta + cos_theta * ((-f - m * l * v**2 * sin_theta) / (M + m))
+    denom = l * (4/3 - (m * cos_theta**2) / (M + m))
+    return num / denom if abs(denom) > 1e-6 else 0
+
+# Misma ecuación que calcula_aceleracion pero para arrays de estados
+def calcula_aceleracion_lote(theta, v, f, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l):
+    sin_theta = np.sin(theta)
+    cos_theta = np.cos(theta)
+    num = G * sin_theta + cos_theta * ((-f - m * l * v**2 * sin_theta) / (M + m))
+    denom = l * (4/3 - (m * cos_theta**2) / (M + m))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.abs(denom) > 1e-6, num / denom, 0.0)
+
+# Simula N carros-péndulo a la vez (uno por cada par theta_0, v_0) con el mismo esquema que simular.
+# Devuelve los tiempos y arrays (N, pasos) de θ en grados, θ' y F; con metricas=True agrega
+# el tiempo de establecimiento y la desviación máxima de cada trayectoria (ver calcular_metricas)
+def simular_lote(controller, t_max, delta_t, theta_0, v_0, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l,
+                 metricas=False, tolerancia=2.0, permanencia=1.0):
+    theta_0, v_0 = np.broadcast_arrays(np.atleast_1d(np.asarray(theta_0, dtype=float)),
+                                       np.atleast_1d(np.asarray(v_0, dtype=float)))
+    theta = np.radians(theta_0.ravel())  # radianes
+    v = v_0.ravel().copy()
+
+    x = np.arange(0, t_max, delta_t)
+    y_theta = np.empty((theta.size, len(x)))
+    y_theta_dot = np.empty_like(y_theta)
+    y_fuerza = np.empty_like(y_theta)
+
+    for paso in range(len(x)):
+        f = controller.infer_batch(theta, v)
+        a = calcula_aceleracion_lote(theta, v, f, M, m, l)
+
+        theta = theta + v * delta_t + a * (delta_t ** 2) / 2
+        v = v + a * delta_t
+
+        # Normalizar el ángulo
+        theta = normalizar_angulo(theta)
+
+        y_theta[:, paso] = np.degrees(theta)
+        y_theta_dot[:, paso] = v
+        y_fuerza[:, paso] = f
+
+    if metricas:
+        return x, y_theta, y_theta_dot, y_fuerza, calcular_metricas(x, y_theta, tolerancia, permanencia)
+    return x, y_theta, y_theta_dot, y_fuerza
+
+# Aceleración del carro ẍ (Barto et al.) a partir de θ'' ya calculada con calcula_aceleracion_lote
+def calcula_aceleracion_carro(theta, v, a, f, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l):
+    return (f + m * l * (v**2 * np.sin(theta) - a * np.cos(theta))) / (M + m)
+
+# Igual que simular_lote pero integrando también la posición x y la velocidad ẋ del carro. Si el
+# controlador tiene n_entradas = 4 recibe (θ, θ', x, ẋ); si no, solo (θ, θ') como siempre.
+# Devuelve los tiempos y arrays (N, pasos) de θ en grados, θ', x, ẋ y F
+def simular_lote_carro(controller, t_max, delta_t, theta_0, v_0, x_0=0.0, x_dot_0=0.0,
+                       M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l):
+    iniciales = np.broadcast_arrays(*(np.atleast_1d(np.asarray(c, dtype=float)) for c in (theta_0, v_0, x_0, x_dot_0)))
+    theta, v, pos, vel = (c.ravel().copy() for c in iniciales)
+    theta = np.radians(theta) # radianes
+    entradas = getattr(controller, "n_entradas", 2)
+
+    x = np.arange(0, t_max, delta_t)
+    y_theta, y_theta_dot, y_x, y_x_dot, y_fuerza = (np.empty((theta.size, len(x))) for _ in range(5))
+
+    for paso in range(len(x)):
+        f = controller.infer_batch(*(theta, v, pos, vel)[:entradas])
+        a = calcula_aceleracion_lote(theta, v, f, M, m, l)
+        a_carro = calcula_aceleracion_carro(theta, v, a, f, M, m, l)
+
+        theta = theta + v * delta_t + a * (delta_t ** 2) / 2
+        v = v + a * delta_t
+        pos = pos + vel * delta_t + a_carro * (delta_t ** 2) / 2
+        vel = vel + a_carro * delta_t
+
+        # Normalizar el ángulo
+        theta = normalizar_angulo(theta)
+
+        y_theta[:, paso] = np.degrees(theta)
+        y_theta_dot[:, paso] = v
+        y_x[:, paso] = pos
+        y_x_dot[:, paso] = vel
+        y_fuerza[:, paso] = f
+
+    return x, y_theta, y_theta_dot, y_x, y_x_dot, y_fuerza
+
+# Tiempo de establecimiento (primer instante desde el cual |θ| queda dentro de la tolerancia, en
+# grados, hasta el final; NaN si no se estabiliza) y desviación máxima de cada trayectoria. Solo
+# cuenta como estabilizada si estuvo dentro de la banda al menos `permanencia` segundos antes del
+# final: una trayectoria que entra justo en las últimas muestras puede estar pasando de largo
+def calcular_metricas(tiempos, y_theta, tolerancia=2.0, permanencia=1.0):
+    tiempos = np.asarray(tiempos)
+    fuera = np.abs(y_theta) > tolerancia
+    pasos = y_theta.shape[1]
+    ultimo_fuera = pasos - 1 - np.argmax(fuera[:, ::-1], axis=1)
+    indice = np.where(fuera.any(axis=1), ultimo_fuera + 1, 0)
+
+    dt = tiempos[1] - tiempos[0] if pasos > 1 else 0
+    estabilizado = indice < pasos
+    estabilizado[estabilizado] = (pasos - indice[estabilizado]) * dt >= permanencia - 1e-9
+    t_establecimiento = np.full(len(y_theta), np.nan)
+    t_establecimiento[estabilizado] = tiempos[indice[estabilizado]]
+    return {
+        "estabilizado": estabilizado,
+        "tiempo_establecimiento": t_establecimiento,
+        "desviacion_maxima": np.abs(y_theta).max(axis=1),
+    }
+
+# Un paso de RK4 de (θ, θ') con la fuerza f constante durante h
+def _paso_rk4(theta, v, f, h, M, m, l):
+    a1 = calcula_aceleracion_lote(theta, v, f, M, m, l)
+    a2 = calcula_aceleracion_lote(theta + v * h / 2, v + a1 * h / 2, f, M, m, l)
+    v2 = v + a1 * h / 2
+    v3 = v + a2 * h / 2
+    a3 = calcula_aceleracion_lote(theta + v2 * h / 2, v3, f, M, m, l)
+    v4 = v + a3 * h
+    a4 = calcula_aceleracion_lote(theta + v3 * h, v4, f, M, m, l)
+    return theta + h * (v + 2 * v2 + 2 * v3 + v4) / 6, v + h * (a1 + 2 * a2 + 2 * a3 + a4) / 6
+
+# Simula un carro-péndulo con el controlador aplicado como retención de orden cero: F se calcula
+# cada dt_control y queda fija mientras la planta se integra con el método elegido:
+#   "taylor": el esquema de simular (θ + v·h + a·h²/2, v + a·h) con pasos h = dt
+#   "rk4": Runge-Kutta de orden 4 con pasos h = dt
+#   "adaptativo": solve_ivp de scipy con paso variable controlado por rtol/atol
+# Devuelve los tiempos de control, θ en grados, θ', F y la cantidad de evaluaciones de la planta
+# y del controlador
+def simular_integrador(controller, t_max, theta_0, v_0, metodo="rk4", dt_control=0.01, dt=None,
+                       rtol=1e-6, atol=1e-9, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l):
+    if metodo not in ("taylor", "rk4", "adaptativo"):
+        raise ValueError(f"Método de integración desconocido: {metodo}")
+    subpasos = max(1, int(round(dt_control / dt))) if dt else 1
+    h = dt_control / subpasos
+
+    theta = np.radians(theta_0)
+    v = float(v_0)
+    x = np.arange(0, t_max, dt_control)
+    y_theta, y_theta_dot, y_fuerza = np.empty(len(x)), np.empty(len(x)), np.empty(len(x))
+    evaluaciones = {"planta": 0, "controlador": 0}
+
+    if metodo == "adaptativo":
+        from scipy.integrate import solve_ivp
+
+    for paso in range(len(x)):
+        f = controller.infer(theta, v)
+        evaluaciones["controlador"] += 1
+
+        if metodo == "taylor":
+            for _ in range(subpasos):
+                a = calcula_aceleracion(theta, v, f, M, m, l)
+                theta, v = theta + v * h + a * (h ** 2) / 2, v + a * h
+            evaluaciones["planta"] += subpasos
+        elif metodo == "rk4":
+            for _ in range(subpasos):
+                theta, v = _paso_rk4(theta, v, f, h, M, m, l)
+            theta, v = float(theta), float(v)
+            evaluaciones["planta"] += 4 * subpasos
+        else:
+            sol = solve_ivp(lambda t, y: (y[1], calcula_aceleracion(y[0], y[1], f, M, m, l)),
+                            (0, dt_control), (theta, v), rtol=rtol, atol=atol)
+            theta, v = sol.y[0, -1], sol.y[1, -1]
+            evaluaciones["planta"] += sol.nfev
+
+        # Normalizar el ángulo
+        theta = normalizar_angulo(theta)
+
+        y_theta[paso] = np.degrees(theta)
+        y_theta_dot[paso] = v
+        y_fuerza[paso] = f
+
+    return x, y_theta, y_theta_dot, y_fuerza, evaluaciones
+
+# Error de cada integrador contra una referencia RK4 de paso fino con la misma tasa de control.
+# El error en θ se mide en grados, sobre los instantes de control
+def comparar_integradores(controller, t_max, theta_0, v_0, dt_control=0.01, dt_referencia=1e-4,
+                          metodos=(("taylor", None), ("rk4", None), ("adaptativo", None)), **kwargs):
+    import time
+
+    _, ref_theta, ref_theta_dot, *_ = simular_integrador(controller, t_max, theta_0, v_0, "rk4",
+                                                         dt_control, dt_referencia, **kwargs)
+    reporte = {}
+    for metodo, dt in metodos:
+        inicio = time.perf_counter()
+        _, y_theta, y_theta_dot, _, evaluaciones = simular_integrador(controller, t_max, theta_0, v_0, metodo,
+                                                                      dt_control, dt, **kwargs)
+        diferencia = (y_theta - ref_theta + 180) % 360 - 180
+        reporte[metodo if dt is None else f"{metodo} (dt={dt})"] = {
+            "error_max_theta": float(np.abs(diferencia).max()),
+            "error_max_theta_dot": float(np.abs(y_theta_dot - ref_theta_dot).max()),
+            "evaluaciones_planta": evaluaciones["planta"],
+            "evaluaciones_controlador": evaluaciones["controlador"],
+            "tiempo": time.perf_counter() - inicio,
+        }
+    return reporte
+
+# Simulación como generador: produce muestras (t, θ en grados, θ', F) una por paso, con el mismo
+# esquema que simular, sin guardar la trayectoria. Con t_max=None no termina nunca. Con
+# activaciones=True cada muestra lleva además la activación de cada regla en el estado usado para F
+def simular_stream(controller, delta_t, theta_0, v_0, t_max=None, M=CONSTANTE_M, m=CONSTANTE_m, l=CONSTANTE_l,
+                   activaciones=False):
+    theta = np.radians(theta_0)  # radianes
+    v = v_0
+    paso = 0
+    while t_max is None or paso * delta_t < t_max:
+        t = paso * delta_t
+        if activaciones:
+            _, activacion_reglas = controller.infer_batch(theta, v, devolver_activaciones=True)
+        f = controller.infer(theta, v)
+        a = calcula_aceleracion(theta, v, f, M, m, l)
+
+        theta = theta + v * delta_t + a * (delta_t ** 2) / 2
+        v = v + a * delta_t
+
+        # Normalizar el ángulo
+        theta = normalizar_angulo(theta)
+
+        if activaciones:
+            yield t, np.degrees(theta), v, f, activacion_reglas
+        else:
+            yield t, np.degrees(theta), v, f
+        paso += 1
+
+_FIN = object()
+
+# Excepción del hilo productor, para volver a lanzarla en el consumidor
+class _ErrorProductor:
+    def __init__(self, error):
+        self.error = error
+
+# Consume `muestras` en un hilo productor y las entrega por una cola acotada: el productor se
+# bloquea cuando la cola está llena, así la memoria no crece con la duración. Al cerrar o abandonar
+# el generador devuelto el productor se detiene
+def flujo_en_hilo(muestras, tamano_cola=256):
+    import queue
+    import threading
+
+    cola = queue.Queue(tamano_cola)
+    detener = threading.Event()
+
+    def encolar(elemento):
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # Siempre termina encolando _FIN o el error del productor, si no el consumidor quedaría
+    # esperando en cola.get() para siempre
+    def producir():
+        fin = _FIN
+        try:
+            for muestra in muestras:
+                if not encolar(muestra):
+                    return
+        except BaseException as error:
+            fin = _ErrorProductor(error)
+        finally:
+            encolar(fin)
+
+    threading.Thread(target=producir, daemon=True).start()
+    try:
+        while (muestra := cola.get()) is not _FIN:
+            if isinstance(muestra, _ErrorProductor):
+                raise muestra.error
+            yield muestra
+    finally:
+        detener.set()
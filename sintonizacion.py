@@ -0,0 +1,170 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from controlador_pendulo_FINAL import FuzzyController, FuzzyRule, FuzzySet, FuzzyVariable, crear_controlador
+from simulacion import simular_lote
+
+# Sintonización automática del controlador con un algoritmo genético. Cada individuo tiene:
+#   puntos: los quiebres de todos los conjuntos de θ, θ' y F, en el orden de crear_controlador()
+#   reglas: el índice del conjunto de F consecuente de cada una de las reglas
+# La forma de cada conjunto (triangular o medio trapecio) y los antecedentes de las reglas se
+# mantienen; el costo se mide simulando un lote de condiciones iniciales
+
+DOMINIOS = {"theta": (-np.pi, np.pi), "theta_dot": (-10, 10), "force": (-30, 30)}
+PESOS = {"tiempo": 1.0, "sobrepaso": 1.0, "esfuerzo": 0.5}
+
+# Estructura fija tomada de un controlador base: (variable, nombre, cantidad de puntos, si es el
+# primer conjunto de la variable) por conjunto
+def _plantilla(base):
+    conjuntos = [(var.name, fs.name, len(fs.points), i == 0) for var in (base.theta_var, base.theta_dot_var, base.force_var)
+                 for i, fs in enumerate(var.sets.values())]
+    antecedentes = [(r.antecedent1, r.antecedent2) for r in base.rules]
+    return conjuntos, antecedentes, list(base.force_var.sets)
+
+def genoma_de(controller):
+    puntos = np.array([p for var in (controller.theta_var, controller.theta_dot_var, controller.force_var)
+                       for fs in var.sets.values() for p in fs.points], dtype=float)
+    etiquetas = list(controller.force_var.sets)
+    reglas = np.array([etiquetas.index(r.consequent) for r in controller.rules])
+    return puntos, reglas
+
+# Deja los puntos en una forma válida: dentro del dominio y ordenados; los medios trapecios (el
+# primer y el último conjunto de cada variable) con el extremo del dominio fijo y el pico (b == c)
+# del lado que corresponde, porque membership distingue izquierdo y derecho por el signo de b
+def reparar(puntos, base):
+    puntos = puntos.copy()
+    inicio = 0
+    for variable, _, n, primero in _plantilla(base)[0]:
+        bajo, alto = DOMINIOS[variable]
+        p = np.clip(np.sort(puntos[inicio:inicio + n]), bajo, alto)
+        if n == 4 and primero:
+            p[0] = bajo
+            p[1] = p[2] = min(p[1], -1e-3)
+            p[3] = max(p[3], p[2])
+        elif n == 4:
+            p[3] = alto
+            p[1] = p[2] = max(p[2], 1e-3)
+            p[0] = min(p[0], p[1])
+        puntos[inicio:inicio + n] = p
+        inicio += n
+    return puntos
+
+def controlador_de(puntos, reglas, base=None):
+    base = base or crear_controlador()
+    conjuntos, antecedentes, etiquetas = _plantilla(base)
+    por_variable = {"theta": [], "theta_dot": [], "force": []}
+    inicio = 0
+    for variable, nombre, n, _ in conjuntos:
+        por_variable[variable].append(FuzzySet(nombre, *puntos[inicio:inicio + n]))
+        inicio += n
+    rules = [FuzzyRule(a1, a2, etiquetas[int(k)]) for (a1, a2), k in zip(antecedentes, reglas)]
+    return FuzzyController(*(FuzzyVariable(v, s) for v, s in por_variable.items()), rules)
+
+# Costo de un controlador: tiempo de establecimiento medio (t_max si no se estabiliza), sobrepaso
+# medio (máximo |θ| después del primer cruce por cero, en fracción de 180°) y esfuerzo (F² medio
+# normalizado por 30²), sobre todas las condiciones iniciales
+def costo(controller, theta_0, v_0, t_max=5, delta_t=0.01, tolerancia=5.0, permanencia=1.0, pesos=PESOS):
+    x, y_theta, _, y_fuerza, metricas = simular_lote(controller.compilar(), t_max, delta_t, theta_0, v_0,
+                                                     metricas=True, tolerancia=tolerancia, permanencia=permanencia)
+    tiempo = np.where(metricas["estabilizado"], metricas["tiempo_establecimiento"], t_max)
+
+    signo_inicial = np.sign(y_theta[:, :1])
+    cruzo = np.cumsum(np.sign(y_theta) != signo_inicial, axis=1) > 0
+    sobrepaso = np.where(cruzo, np.abs(y_theta), 0).max(axis=1) / 180
+
+    esfuerzo = np.mean(y_fuerza ** 2, axis=1) / 30 ** 2
+    return float(pesos["tiempo"] * tiempo.mean() / t_max + pesos["sobrepaso"] * sobrepaso.mean() +
+                 pesos["esfuerzo"] * esfuerzo.mean())
+
+def _evaluar(tarea):
+    puntos, reglas, theta_0, v_0, opciones = tarea
+    return costo(controlador_de(puntos, reglas), theta_0, v_0, **opciones)
+
+# Algoritmo genético con elitismo, torneo, cruce (BLX en los puntos, uniforme en las reglas) y
+# mutación. El costo de cada generación se evalúa en paralelo. Después de cada generación se guarda
+# el estado en `checkpoint`; si el archivo existe al empezar, se continúa desde ahí (tiene que ser
+# del mismo escenario: con otras condiciones iniciales o parámetros los costos no se comparan)
+def sintonizar(generaciones=30, poblacion=24, theta_0=(-90, -45, -10, 10, 45, 90), v_0=(-2, 0, 2),
+               elite=2, prob_mutacion=0.2, sigma=0.05, prob_mutacion_regla=0.04, procesos=None,
+               checkpoint="sintonizacion.pkl", semilla=0, **opciones):
+    base = crear_controlador()
+    T0, V0 = np.meshgrid(np.asarray(theta_0, float), np.asarray(v_0, float))
+    T0, V0 = T0.ravel(), V0.ravel()
+    etiquetas = len(base.force_var.sets)
+    escala = np.array([DOMINIOS[v][1] - DOMINIOS[v][0] for v, _, n, _ in _plantilla(base)[0] for _ in range(n)])
+    parametros = {"theta_0": T0.tolist(), "v_0": V0.tolist(), "poblacion": poblacion, "elite": elite,
+                  "prob_mutacion": prob_mutacion, "sigma": sigma, "prob_mutacion_regla": prob_mutacion_regla,
+                  "semilla": semilla, "opciones": opciones}
+
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint, "rb") as f:
+            estado = pickle.load(f)
+        distintos = [k for k, v in parametros.items() if estado.get("parametros", {}).get(k) != v]
+        if distintos:
+            raise ValueError(f"El checkpoint {checkpoint} es de otra sintonización (distinto {', '.join(distintos)}); "
+                             "borrarlo o usar otro nombre")
+        rng = np.random.default_rng()
+        rng.bit_generator.state = estado["rng"]
+    else:
+        # Población inicial: el controlador a mano más variaciones de él
+        rng = np.random.default_rng(semilla)
+        puntos, reglas = genoma_de(base)
+        P = np.array([reparar(puntos + (i > 0) * rng.normal(0, sigma, puntos.shape) * escala, base) for i in range(poblacion)])
+        R = np.array([np.where(rng.random(reglas.shape) < (i > 0) * prob_mutacion_regla,
+                               rng.integers(0, etiquetas, reglas.shape), reglas) for i in range(poblacion)])
+        estado = {"generacion": 0, "puntos": P, "reglas": R, "costos": None, "historial": [], "parametros": parametros}
+
+    with ProcessPoolExecutor(procesos) as pool:
+        def evaluar(P, R):
+            return np.array(list(pool.map(_evaluar, [(p, r, T0, V0, opciones) for p, r in zip(P, R)])))
+
+        if estado["costos"] is None:
+            estado["costos"] = evaluar(estado["puntos"], estado["reglas"])
+            estado["costo_original"] = float(estado["costos"][0]) # el individuo 0 es el controlador a mano
+
+        while estado["generacion"] < generaciones:
+            P, R, costos = estado["puntos"], estado["reglas"], estado["costos"]
+            orden = np.argsort(costos)
+
+            def torneo():
+                a, b = rng.integers(0, len(P), 2)
+                return a if costos[a] < costos[b] else b
+
+            hijos_P, hijos_R = [P[i] for i in orden[:elite]], [R[i] for i in orden[:elite]]
+            while len(hijos_P) < len(P):
+                i, j = torneo(), torneo()
+                alfa = rng.uniform(-0.25, 1.25, P.shape[1])
+                hijo = P[i] + alfa * (P[j] - P[i])
+                mutar = rng.random(P.shape[1]) < prob_mutacion
+                hijo = reparar(hijo + mutar * rng.normal(0, sigma, P.shape[1]) * escala, base)
+                reglas = np.where(rng.random(R.shape[1]) < 0.5, R[i], R[j])
+                reglas = np.where(rng.random(R.shape[1]) < prob_mutacion_regla, rng.integers(0, etiquetas, R.shape[1]), reglas)
+                hijos_P.append(hijo)
+                hijos_R.append(reglas)
+
+            P, R = np.array(hijos_P), np.array(hijos_R)
+            costos = np.concatenate([costos[orden[:elite]], evaluar(P[elite:], R[elite:])])
+            estado.update(generacion=estado["generacion"] + 1, puntos=P, reglas=R, costos=costos)
+            estado["historial"].append((float(costos.min()), float(costos.mean())))
+            print(f"Generación {estado['generacion']}: mejor {costos.min():.4f}, media {costos.mean():.4f}")
+
+            if checkpoint:
+                estado["rng"] = rng.bit_generator.state
+                with open(checkpoint + ".tmp", "wb") as f:
+                    pickle.dump(estado, f)
+                os.replace(checkpoint + ".tmp", checkpoint) # no deja un checkpoint a medio escribir
+
+    mejor = int(np.argmin(estado["costos"]))
+    return controlador_de(estado["puntos"][mejor], estado["reglas"][mejor], base), estado
+
+
+if __name__ == "__main__":
+    controller, estado = sintonizar()
+    print("Costo del mejor controlador:", estado["costos"].min(), "- original:", estado["costo_original"])
+    for var in (controller.theta_var, controller.theta_dot_var, controller.force_var):
+        for fs in var.sets.values():
+            print(var.name, fs.name, np.round(fs.points, 3))
+    print([(r.antecedent1, r.antecedent2, r.consequent) for r in controller.rules])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from controlador_pendulo_FINAL import crear_controlador
+
+# Estados al azar más todas las combinaciones de quiebres de los conjuntos de θ y θ'
+def _estados(n=300, semilla=0):
+    controller = crear_controlador()
+    rng = np.random.default_rng(semilla)
+    quiebres_theta = sorted({p for fs in controller.theta_var.sets.values() for p in fs.points})
+    quiebres_theta_dot = sorted({p for fs in controller.theta_dot_var.sets.values() for p in fs.points})
+    T, V = np.meshgrid(quiebres_theta, quiebres_theta_dot)
+    theta = np.concatenate([rng.uniform(-np.pi, np.pi, n), T.ravel()])
+    theta_dot = np.concatenate([rng.uniform(-10, 10, n), V.ravel()])
+    return theta, theta_dot
+
+# El error de la grilla es O(1/n): con 200001 puntos queda en ~1e-4 N y al multiplicar los puntos
+# por 10 baja 10 veces, o sea que el analítico es el límite exacto
+def test_centroide_analitico_igual_al_discretizado_fino():
+    theta, theta_dot = _estados()
+    analitico = crear_controlador().compilar_analitico().infer_batch(theta, theta_dot)
+    errores = [np.abs(analitico - crear_controlador().compilar(n).infer_batch(theta, theta_dot, tamano_bloque=64)).max()
+               for n in (20001, 200001)]
+    assert errores[1] < 1.5e-4
+    assert errores[1] < errores[0] / 8
+
+def test_analitico_escalar_igual_a_lote():
+    theta, theta_dot = _estados(50)
+    controller = crear_controlador().compilar_analitico()
+    lote = controller.infer_batch(theta, theta_dot)
+    # El escalar solo corta los niveles > 0, así que puede diferir en el redondeo
+    assert np.allclose(lote, [controller.infer(t, v) for t, v in zip(theta, theta_dot)], rtol=0, atol=1e-12)
+
+def test_membership_array_igual_a_escalar():
+    controller = crear_controlador()
+    for var, rango in ((controller.theta_var, (-np.pi, np.pi)), (controller.theta_dot_var, (-10, 10)),
+                       (controller.force_var, (-30, 30))):
+        puntos = [p for fs in var.sets.values() for p in fs.points]
+        x = np.concatenate([np.linspace(rango[0] - 1, rango[1] + 1, 2001), puntos])
+        for fs in var.sets.values():
+            escalar = np.array([fs.membership(float(v)) for v in x], dtype=float)
+            assert np.array_equal(fs.membership(x), escalar), fs.name
+
+def test_actualizar_reglas_conserva_la_grilla_de_la_tabla():
+    controller = crear_controlador().compilar_tabla(51, 51, rango_theta_dot=(-5, 5))
+    controller.actualizar_reglas(controller.rules[::-1])
+    eje_theta, eje_theta_dot = controller.ejes_tabla
+    assert (len(eje_theta), len(eje_theta_dot)) == (51, 51)
+    assert (eje_theta_dot[0], eje_theta_dot[-1]) == (-5, 5)
+
+def test_tabla_misma_fuerza_con_y_sin_activaciones():
+    theta, theta_dot = _estados()
+    controller = crear_controlador().compilar_tabla(21, 21)
+    fuerzas, activaciones = controller.infer_batch(theta, theta_dot, devolver_activaciones=True)
+    assert np.array_equal(fuerzas, controller.infer_batch(theta, theta_dot))
+    _, exactas = crear_controlador().infer_batch(theta, theta_dot, devolver_activaciones=True)
+    assert np.array_equal(activaciones, exactas)
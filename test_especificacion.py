@@ -0,0 +1,19 @@
+import numpy as np
+
+import especificacion
+from especificacion import cargar_controlador
+
+def test_cache_en_otra_carpeta(tmp_path, monkeypatch):
+    monkeypatch.setattr(especificacion, "CARPETA_CACHE", str(tmp_path))
+    compilado = cargar_controlador(modo="analitico")
+    assert len(list(tmp_path.iterdir())) == 1
+    desde_cache = cargar_controlador(modo="analitico")
+    assert desde_cache.infer(0.3, -1.0) == compilado.infer(0.3, -1.0)
+
+# Sin poder escribir la cache se compila igual
+def test_cache_sin_permiso_de_escritura(tmp_path, monkeypatch):
+    archivo = tmp_path / "archivo"
+    archivo.write_text("")
+    monkeypatch.setattr(especificacion, "CARPETA_CACHE", str(archivo / "cache")) # no se puede crear
+    controller = cargar_controlador(modo="compilado")
+    assert np.isclose(controller.infer(0.3, -1.0), cargar_controlador(modo="compilado", cache=False).infer(0.3, -1.0))
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from registro import leer_registro, registrar_lote
+
+def _lote(theta_0):
+    tiempos = np.arange(0, 0.5, 0.01)
+    y = np.full((1, len(tiempos)), theta_0, dtype=float)
+    return tiempos, y, np.zeros_like(y), np.zeros_like(y)
+
+def test_registrar_reescribe_el_archivo_existente(tmp_path):
+    ruta = str(tmp_path / "lote.tray")
+    registrar_lote(ruta, *_lote(-90), metadatos={"theta_0": -90})
+    registrar_lote(ruta, *_lote(30), metadatos={"theta_0": 30})
+    columnas, metadatos = leer_registro(ruta)
+    assert len(columnas["t"]) == 50
+    assert metadatos == {"theta_0": 30}
+    assert np.all(columnas["theta"] == 30)
+
+def test_anexar_exige_los_mismos_metadatos(tmp_path):
+    ruta = str(tmp_path / "lote.tray")
+    registrar_lote(ruta, *_lote(-90), metadatos={"theta_0": -90})
+    registrar_lote(ruta, *_lote(-90), metadatos={"theta_0": -90}, anexar=True)
+    assert len(leer_registro(ruta)[0]["t"]) == 100
+    with pytest.raises(ValueError, match="metadatos"):
+        registrar_lote(ruta, *_lote(30), metadatos={"theta_0": 30}, anexar=True)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from simulacion import calcular_metricas, flujo_en_hilo
+
+def test_metricas_exigen_permanencia_en_la_banda():
+    tiempos = np.arange(0, 2, 0.01)
+    y_theta = np.full((2, len(tiempos)), 10.0)
+    y_theta[0, -1] = 1.0 # entra en la banda en la última muestra
+    y_theta[1, 50:] = 1.0 # entra en t = 0.5 y se queda 1.5 s
+    metricas = calcular_metricas(tiempos, y_theta, tolerancia=2.0, permanencia=1.0)
+    assert metricas["estabilizado"].tolist() == [False, True]
+    assert np.isnan(metricas["tiempo_establecimiento"][0])
+    assert np.isclose(metricas["tiempo_establecimiento"][1], 0.5)
+
+def test_flujo_en_hilo_propaga_el_error_del_productor():
+    def muestras():
+        yield 1
+        raise RuntimeError("falla de la planta")
+
+    recibidas = []
+    with pytest.raises(RuntimeError, match="falla de la planta"):
+        for muestra in flujo_en_hilo(muestras()):
+            recibidas.append(muestra)
+    assert recibidas == [1]
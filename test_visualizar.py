@@ -0,0 +1,34 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+
+from controlador_pendulo_FINAL import crear_controlador
+from simulacion import simular_lote
+from visualizar import InspectorInferencia
+
+# En modo compilado el centroide de la salida agregada que se muestra tiene que ser la F grabada
+def test_inspector_alinea_estado_y_fuerza():
+    controller = crear_controlador().compilar()
+    tiempos, y_theta, y_theta_dot, y_fuerza = simular_lote(controller, 0.5, 0.01, -90, 0)
+    for inicial in ((-90, 0), None):
+        inspector = InspectorInferencia(controller).cargar_trayectoria(y_theta[0], y_theta_dot[0], y_fuerza[0],
+                                                                       tiempos, inicial)
+        fuerza = inspector.trayectoria[2]
+        centroides = np.array([inspector.agregar(a)[1] for a in inspector.activaciones])
+        assert np.abs(centroides - fuerza).max() < 1e-9
+
+# Cargar otra trayectoria reusa el slider: una tecla avanza un solo paso
+def test_inspector_recargar_trayectoria_no_duplica_el_slider():
+    from matplotlib.backend_bases import KeyEvent
+
+    controller = crear_controlador().compilar()
+    tiempos, y_theta, y_theta_dot, y_fuerza = simular_lote(controller, 0.5, 0.01, [-90, 30], 0)
+    inspector = InspectorInferencia(controller)
+    for i in range(2):
+        inspector.cargar_trayectoria(y_theta[i], y_theta_dot[i], y_fuerza[i], tiempos, (y_theta[i][0], 0))
+    assert len(inspector.fig.axes) == 4
+    assert inspector.slider.val == 0 and inspector.slider.valmax == len(tiempos) - 1
+    inspector.fig.canvas.callbacks.process("key_press_event", KeyEvent("key_press_event", inspector.fig.canvas, "right"))
+    assert inspector.slider.val == 1
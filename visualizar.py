@@ -1,30 +1,257 @@
+import time
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-# Función para visualización en tiempo real de theta y F
-def visualizar_en_tiempo_real(theta_vals, fuerza_vals, tiempo_vals):
-    plt.ion()
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 6))
-
-    line1, = ax1.plot([], [], label='θ (°)')
-    ax1.set_xlim(tiempo_vals[0], tiempo_vals[-1])
-    ax1.set_ylim(min(theta_vals)-10, max(theta_vals)+10)
-    ax1.set_ylabel("Ángulo θ (°)")
-    ax1.grid(True)
-
-    line2, = ax2.plot([], [], label='F (N)', color='orange')
-    ax2.set_xlim(tiempo_vals[0], tiempo_vals[-1])
-    ax2.set_ylim(min(fuerza_vals)-5, max(fuerza_vals)+5)
-    ax2.set_xlabel("Tiempo (s)")
-    ax2.set_ylabel("Fuerza aplicada F (N)")
-    ax2.grid(True)
-
-    for i in range(len(tiempo_vals)):
-        line1.set_data(tiempo_vals[:i+1], theta_vals[:i+1])
-        line2.set_data(tiempo_vals[:i+1], fuerza_vals[:i+1])
-        fig.canvas.draw()
-        fig.canvas.flush_events()
-        plt.pause(0.001)
-
-    plt.ioff()
-    plt.show()
+# Gráfico en vivo de θ y F con blitting: los ejes, la grilla y las etiquetas se dibujan una sola vez
+# y se guardan como fondo; en cada actualización se restaura ese fondo y se redibujan solo las dos
+# líneas. Las muestras van a buffers circulares de tamaño fijo que cubren la ventana de tiempo
+# visible, así el costo por actualización no crece con la duración de la corrida. Cuando t pasa el
+# borde derecho la ventana avanza una página entera (única vez que se redibuja todo)
+class GraficoEnVivo:
+    def __init__(self, ventana, dt, rango_theta=(-190, 190), rango_fuerza=(-35, 35), t_inicial=0.0):
+        self.ventana = ventana
+        capacidad = int(np.ceil(ventana / dt)) + 2
+        self.t = np.full(capacidad, np.nan)
+        self.theta = np.full(capacidad, np.nan)
+        self.fuerza = np.full(capacidad, np.nan)
+        self.indice = 0 # próxima posición a escribir
+
+        plt.ion()
+        self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1, figsize=(10, 6))
+        self.line1, = self.ax1.plot([], [], label='θ (°)', animated=True)
+        self.ax1.set_ylim(*rango_theta)
+        self.ax1.set_ylabel("Ángulo θ (°)")
+        self.ax1.grid(True)
+
+        self.line2, = self.ax2.plot([], [], label='F (N)', color='orange', animated=True)
+        self.ax2.set_ylim(*rango_fuerza)
+        self.ax2.set_xlabel("Tiempo (s)")
+        self.ax2.set_ylabel("Fuerza aplicada F (N)")
+        self.ax2.grid(True)
+
+        self.fondos = None
+        self.fig.canvas.mpl_connect("draw_event", self._guardar_fondos) # también al redimensionar
+        self._mover_ventana(t_inicial)
+        plt.show(block=False)
+
+    def _guardar_fondos(self, evento=None):
+        self.fondos = [self.fig.canvas.copy_from_bbox(ax.bbox) for ax in (self.ax1, self.ax2)]
+
+    def _mover_ventana(self, t_inicial):
+        for ax in (self.ax1, self.ax2):
+            ax.set_xlim(t_inicial, t_inicial + self.ventana)
+        self.fig.canvas.draw() # dispara _guardar_fondos
+
+    def agregar(self, t, theta, fuerza):
+        i = self.indice % len(self.t)
+        self.t[i], self.theta[i], self.fuerza[i] = t, theta, fuerza
+        self.indice += 1
+
+    # Redibuja las líneas con lo que hay en los buffers
+    def actualizar(self):
+        if self.indice == 0:
+            return
+        t_ultimo = self.t[(self.indice - 1) % len(self.t)]
+        if t_ultimo > self.ax1.get_xlim()[1]:
+            self._mover_ventana(t_ultimo)
+
+        # Orden cronológico del buffer circular
+        corte = self.indice % len(self.t)
+        t = np.concatenate([self.t[corte:], self.t[:corte]])
+        self.line1.set_data(t, np.concatenate([self.theta[corte:], self.theta[:corte]]))
+        self.line2.set_data(t, np.concatenate([self.fuerza[corte:], self.fuerza[:corte]]))
+
+        for ax, linea, fondo in zip((self.ax1, self.ax2), (self.line1, self.line2), self.fondos):
+            self.fig.canvas.restore_region(fondo)
+            ax.draw_artist(linea)
+            self.fig.canvas.blit(ax.bbox)
+        self.fig.canvas.flush_events()
+
+    def cerrar(self):
+        plt.ioff()
+        plt.show()
+
+# Función para visualización en tiempo real de theta y F.
+# decimacion: se grafica una de cada `decimacion` muestras.
+# lote: muestras que se agregan entre dos redibujados; con lote=None se ajusta solo para que el
+# gráfico vaya al ritmo de la simulación (se agregan todas las muestras cuyo tiempo ya pasó en el reloj)
+# ventana: segundos visibles a la vez; fija el tamaño de los buffers y el costo de cada redibujado
+def visualizar_en_tiempo_real(theta_vals, fuerza_vals, tiempo_vals, decimacion=1, lote=None, ventana=10.0):
+    theta_vals = np.asarray(theta_vals)[::decimacion]
+    fuerza_vals = np.asarray(fuerza_vals)[::decimacion]
+    tiempo_vals = np.asarray(tiempo_vals)[::decimacion]
+    dt = tiempo_vals[1] - tiempo_vals[0] if len(tiempo_vals) > 1 else 1.0
+
+    grafico = GraficoEnVivo(min(ventana, tiempo_vals[-1] - tiempo_vals[0] + dt), dt,
+                            (min(theta_vals)-10, max(theta_vals)+10),
+                            (min(fuerza_vals)-5, max(fuerza_vals)+5), tiempo_vals[0])
+
+    inicio = time.perf_counter()
+    i = 0
+    while i < len(tiempo_vals):
+        if lote is None:
+            transcurrido = tiempo_vals[0] + time.perf_counter() - inicio
+            if tiempo_vals[i] > transcurrido: # adelantados respecto del reloj: esperar la próxima muestra
+                time.sleep(tiempo_vals[i] - transcurrido)
+                transcurrido = tiempo_vals[i]
+            fin = max(i + 1, np.searchsorted(tiempo_vals, transcurrido, side="right"))
+        else:
+            fin = i + lote
+        for t, theta, fuerza in zip(tiempo_vals[i:fin], theta_vals[i:fin], fuerza_vals[i:fin]):
+            grafico.agregar(t, theta, fuerza)
+        grafico.actualizar()
+        i = fin
+
+    grafico.cerrar()
+
+# Inspector de la inferencia de un FuzzyController: las curvas de pertenencia se calculan una sola
+# vez y la figura es siempre la misma; mostrar solo mueve las marcas de las entradas, la salida
+# agregada y el centroide, y las redibuja con blitting sobre el fondo guardado (igual que
+# GraficoEnVivo). Con cargar_trayectoria se recorre paso a paso una corrida grabada (slider
+# o flechas del teclado) con las activaciones de todos los pasos calculadas de una vez con arrays
+class InspectorInferencia:
+    def __init__(self, controller, n_puntos=1000, rango_theta_dot=(-10, 10)):
+        self.controller = controller
+        self.ejes = (np.linspace(-np.pi, np.pi, n_puntos), np.linspace(*rango_theta_dot, n_puntos),
+                     np.linspace(*controller.rango_fuerza, n_puntos))
+        variables = (controller.theta_var, controller.theta_dot_var, controller.force_var)
+        self.curvas = [var.fuzzify_array(x) for var, x in zip(variables, self.ejes)]
+        self.trayectoria = None
+        self.slider = None
+
+        self.fig, self.axs = plt.subplots(3, 1, figsize=(10, 12))
+        titulos = ("Funciones de pertenencia de θ (posición)", "Funciones de pertenencia de θ' (velocidad angular)",
+                   "Funciones de pertenencia de la fuerza y salida combinada")
+        etiquetas_x = ("θ (rad)", "θ' (rad/s)", "Fuerza (N)")
+        for ax, var, x, curvas, titulo, etiqueta in zip(self.axs, variables, self.ejes, self.curvas, titulos, etiquetas_x):
+            for label, μ in zip(var.sets, curvas):
+                ax.plot(x, μ, linestyle='--', label=label)
+            ax.set_title(titulo)
+            ax.set_xlabel(etiqueta)
+            ax.set_ylabel("μ")
+            ax.set_ylim(-0.05, 1.1)
+            ax.grid(True)
+            ax.legend(loc="upper right")
+
+        # Lo único que cambia de una inferencia a otra (animated: no forma parte del fondo)
+        self.marca_theta = self.axs[0].axvline(0, color='red', animated=True)
+        self.marca_theta_dot = self.axs[1].axvline(0, color='red', animated=True)
+        self.salida, = self.axs[2].plot(self.ejes[2], np.zeros(n_puntos), color='black', linewidth=2.5, animated=True)
+        self.marca_centroide = self.axs[2].axvline(0, color='red', animated=True)
+        self.textos = [ax.text(0.01, 0.92, "", transform=ax.transAxes, animated=True) for ax in self.axs]
+        self.titulo = self.fig.suptitle("", animated=True)
+        self.dinamicos = [self.marca_theta, self.marca_theta_dot, self.salida, self.marca_centroide, *self.textos, self.titulo]
+        self.fig.tight_layout()
+        self.fig.subplots_adjust(hspace=0.4, top=0.93)
+
+        self.fondo = None
+        self.fig.canvas.mpl_connect("draw_event", self._guardar_fondo)
+
+    # Después de un dibujado completo (el primero, al redimensionar) se guarda el fondo y se
+    # vuelven a pintar encima los artistas dinámicos
+    def _guardar_fondo(self, evento=None):
+        self.fondo = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._dibujar_dinamicos()
+
+    def _dibujar_dinamicos(self):
+        for artista in self.dinamicos:
+            self.fig.draw_artist(artista)
+
+    # Activación de cada conjunto de F para arrays de θ (rad) y θ': (N, conjuntos de F)
+    def _activaciones(self, theta, theta_dot):
+        c = self.controller
+        a1, a2, cons = c.indices_reglas.T
+        activaciones = np.minimum(c.theta_var.fuzzify_array(theta)[a1], c.theta_dot_var.fuzzify_array(theta_dot)[a2])
+        act_consecuente = np.zeros((len(theta), len(c.force_var.sets)))
+        for k in range(act_consecuente.shape[1]):
+            if np.any(cons == k):
+                act_consecuente[:, k] = activaciones[cons == k].max(axis=0)
+        return act_consecuente
+
+    # Salida agregada sobre el eje de F y su centroide
+    def agregar(self, activaciones):
+        salida = np.minimum(activaciones[:, None], self.curvas[2]).max(axis=0)
+        den = salida.sum()
+        return salida, float(np.dot(self.ejes[2], salida) / den) if den != 0 else 0
+
+    # Sin centroide se usa el de Mamdani sobre la salida agregada (en modo sugeno o tabla la fuerza
+    # del controlador es otra: conviene pasarla)
+    def mostrar(self, theta, theta_dot, centroide=None, activaciones=None, titulo=None):
+        if activaciones is None:
+            activaciones = self._activaciones(np.atleast_1d(float(theta)), np.atleast_1d(float(theta_dot)))[0]
+        salida, centroide_mamdani = self.agregar(activaciones)
+        if centroide is None:
+            centroide = centroide_mamdani
+
+        self.marca_theta.set_xdata([theta, theta])
+        self.marca_theta_dot.set_xdata([theta_dot, theta_dot])
+        self.salida.set_ydata(salida)
+        self.marca_centroide.set_xdata([centroide, centroide])
+        self.textos[0].set_text(f"θ = {theta:.3f} rad")
+        self.textos[1].set_text(f"θ' = {theta_dot:.3f} rad/s")
+        self.textos[2].set_text(f"Centroide = {centroide:.2f} N")
+        if titulo is not None:
+            self.titulo.set_text(titulo)
+
+        if self.fondo is None: # todavía no se dibujó nunca: el draw_event pinta todo
+            self.fig.canvas.draw_idle()
+            return
+        self.fig.canvas.restore_region(self.fondo)
+        self._dibujar_dinamicos()
+        self.fig.canvas.blit(self.fig.bbox)
+        self.fig.canvas.flush_events()
+
+    # Corrida grabada: θ en grados (como la devuelven simular y los registros), θ' y opcionalmente
+    # la fuerza aplicada y los tiempos. simular, simular_stream y los registros guardan en cada paso
+    # el estado de después del paso, pero F[i] salió del estado anterior: cada paso del inspector
+    # muestra el estado que vio el controlador junto con la F que dio. Con el estado inicial
+    # (inicial=(θ_0 en grados, θ'_0)) se antepone y se descarta el último estado; sin él se
+    # empieza desde el segundo paso
+    def cargar_trayectoria(self, theta_grados, theta_dot, fuerza=None, tiempos=None, inicial=None):
+        from matplotlib.widgets import Slider
+
+        theta = np.radians(np.asarray(theta_grados, dtype=float))
+        theta_dot = np.asarray(theta_dot, dtype=float)
+        fuerza = None if fuerza is None else np.asarray(fuerza, dtype=float)
+        tiempos = np.arange(len(theta)) if tiempos is None else np.asarray(tiempos)
+        if inicial is not None:
+            theta = np.concatenate([[np.radians(inicial[0])], theta[:-1]])
+            theta_dot = np.concatenate([[inicial[1]], theta_dot[:-1]])
+        else:
+            theta, theta_dot = theta[:-1], theta_dot[:-1]
+            fuerza = None if fuerza is None else fuerza[1:]
+            tiempos = tiempos[1:]
+        self.trayectoria = (theta, theta_dot, fuerza, tiempos)
+        self.activaciones = self._activaciones(theta, theta_dot)
+
+        # El slider y la tecla se conectan con la primera trayectoria; las siguientes solo cambian
+        # el rango del slider
+        if self.slider is None:
+            self.fig.subplots_adjust(bottom=0.08)
+            ax_slider = self.fig.add_axes([0.15, 0.01, 0.7, 0.02])
+            self.slider = Slider(ax_slider, "paso", 0, len(theta) - 1, valinit=0, valstep=1)
+            self.slider.drawon = False # lo redibuja mostrar con el resto, sin dibujar toda la figura
+            ax_slider.set_animated(True)
+            self.dinamicos.append(ax_slider)
+            self.slider.on_changed(lambda valor: self.mostrar_paso(int(valor)))
+            self.fig.canvas.mpl_connect("key_press_event", self._tecla)
+        else:
+            self.slider.valmax = len(theta) - 1
+            self.slider.ax.set_xlim(0, max(len(theta) - 1, 1))
+        self.fondo = None # la figura cambió
+        self.slider.set_val(0) # muestra el paso 0
+        return self
+
+    def mostrar_paso(self, paso):
+        theta, theta_dot, fuerza, tiempos = self.trayectoria
+        self.mostrar(theta[paso], theta_dot[paso], None if fuerza is None else fuerza[paso],
+                     self.activaciones[paso], f"Paso {paso} (t = {tiempos[paso]:.2f})")
+
+    def _tecla(self, evento):
+        salto = {"right": 1, "left": -1, "up": 10, "down": -10}.get(evento.key)
+        if salto is not None:
+            self.slider.set_val(int(np.clip(self.slider.val + salto, self.slider.valmin, self.slider.valmax)))
+
+    def abierto(self):
+        return plt.fignum_exists(self.fig.number)